@@ -3,9 +3,42 @@
 
 import os
 import shutil
+import subprocess
 from pathlib import Path
 
 
+def _scan_pycache(path):
+    """Yield __pycache__ directories under path, skipping hidden dirs and symlinks."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_symlink() or not entry.is_dir(follow_symlinks=False):
+                continue
+            if entry.name == "__pycache__":
+                yield entry.path
+            elif not entry.name.startswith("."):
+                yield from _scan_pycache(entry.path)
+
+
+def _count_pyc(path):
+    with os.scandir(path) as entries:
+        return sum(1 for entry in entries if entry.name.endswith(".pyc"))
+
+
+def _fast_rm(paths):
+    """Remove directories with a single native `rm -rf`, falling back to shutil."""
+    if not paths:
+        return
+    if os.name == "posix" and shutil.which("rm"):
+        try:
+            subprocess.run(["rm", "-rf", "--", *paths], check=True)
+            return
+        except (OSError, subprocess.CalledProcessError):
+            pass  # Fall back to removing one by one below
+    for path in paths:
+        if os.path.exists(path):
+            shutil.rmtree(path)
+
+
 def main():
     project_root = Path(__file__).parent
     print(f"Clearing caches in: {project_root}")
@@ -14,19 +47,23 @@ def main():
     pyc_count = 0
     pycache_count = 0
 
-    # Remove .pyc files and __pycache__ directories
-    for pycache_dir in project_root.rglob("__pycache__"):
+    # Collect __pycache__ directories, counting .pyc files before removal
+    pycache_dirs = []
+    for pycache_dir in _scan_pycache(project_root):
         try:
-            # Count .pyc files before removal
-            pyc_files = list(pycache_dir.glob("*.pyc"))
-            pyc_count += len(pyc_files)
-
-            # Remove the entire __pycache__ directory
-            shutil.rmtree(pycache_dir)
-            pycache_count += 1
-            print(f"  Removed: {pycache_dir.relative_to(project_root)}")
-        except Exception as e:
-            print(f"  Warning: Could not remove {pycache_dir}: {e}")
+            pyc_count += _count_pyc(pycache_dir)
+        except OSError as e:
+            print(f"  Warning: Could not read {pycache_dir}: {e}")
+        pycache_dirs.append(pycache_dir)
+
+    # Remove all of them in one batch
+    try:
+        _fast_rm(pycache_dirs)
+        pycache_count = len(pycache_dirs)
+        for pycache_dir in pycache_dirs:
+            print(f"  Removed: {os.path.relpath(pycache_dir, project_root)}")
+    except Exception as e:
+        print(f"  Warning: Could not remove __pycache__ directories: {e}")
 
     # Remove .pytest_cache
     pytest_cache = project_root / ".pytest_cache"
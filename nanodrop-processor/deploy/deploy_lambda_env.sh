@@ -262,6 +262,22 @@ create_dynamodb_tables() {
         aws dynamodb wait table-exists --table-name $REQUESTS_TABLE --region $AWS_REGION
         log_info "$REQUESTS_TABLE table created ✓"
     fi
+
+    # Index for time-window queries (scripts/check_recent_requests.py); added
+    # separately so tables created before it existed pick it up too
+    if ! aws dynamodb describe-table --table-name $REQUESTS_TABLE --region $AWS_REGION \
+            --query "Table.GlobalSecondaryIndexes[].IndexName" --output text | grep -q date-partition-index; then
+        log_info "Adding date-partition-index to $REQUESTS_TABLE..."
+        aws dynamodb update-table \
+            --table-name $REQUESTS_TABLE \
+            --attribute-definitions \
+                AttributeName=date_partition,AttributeType=S \
+                AttributeName=timestamp,AttributeType=S \
+            --global-secondary-index-updates \
+                '[{"Create":{"IndexName":"date-partition-index","KeySchema":[{"AttributeName":"date_partition","KeyType":"HASH"},{"AttributeName":"timestamp","KeyType":"RANGE"}],"Projection":{"ProjectionType":"ALL"}}}]' \
+            --region $AWS_REGION > /dev/null
+        log_info "date-partition-index requested (builds in the background) ✓"
+    fi
     
     # Create user stats table
     USER_STATS_TABLE="${TABLE_PREFIX}nanodrop-user-stats"
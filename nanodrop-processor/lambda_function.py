@@ -3,6 +3,13 @@ Root-level import shim for lambda_function.
 
 This allows tests to import lambda_function from the root directory
 while the actual implementation lives in src/lambda_function.py.
+
+The real module is aliased in sys.modules rather than star-imported, so
+there is a single module object: patches applied to lambda_function.<name>
+reach the code that actually runs.
 """
 
-from src.lambda_function import *
+import importlib
+import sys
+
+sys.modules[__name__] = importlib.import_module("src.lambda_function")
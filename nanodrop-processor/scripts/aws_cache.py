@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Short-lived on-disk cache for AWS list/describe calls made by the debugging scripts.
+
+Control-plane calls like describe_log_groups and list_buckets are slow and
+throttled aggressively, so repeated runs of the scripts reuse a recent result
+instead. Entries live in ~/.cache/nanodrop/ and are keyed by function name,
+arguments (other than boto3 clients), account and region.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from functools import lru_cache, wraps
+from pathlib import Path
+
+import boto3
+from botocore.client import BaseClient
+
+from aws_config import CLIENT_CONFIG
+
+CACHE_DIR = Path.home() / '.cache' / 'nanodrop'
+
+_enabled = True
+
+
+def disable():
+    """Bypass the cache for the rest of the run (--no-cache)."""
+    global _enabled
+    _enabled = False
+
+
+@lru_cache(maxsize=None)
+def _scope(region):
+    """Account and region the cached results belong to."""
+    session = boto3.Session(region_name=region)
+    account = session.client('sts', config=CLIENT_CONFIG).get_caller_identity()['Account']
+    return account, region
+
+
+def _client_region(args):
+    """Region of the first boto3 client among a cached call's arguments."""
+    return next((arg.meta.region_name for arg in args if isinstance(arg, BaseClient)), None)
+
+
+def warm(client):
+    """Resolve the cache scope for client's region up front, before fanning out to threads."""
+    if _enabled:
+        _scope(client.meta.region_name)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def disk_cache(ttl=300):
+    """Cache a function's JSON-serializable result on disk for `ttl` seconds."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+
+            # Clients passed in are plumbing, not part of what is being cached
+            key_args = [arg for arg in args if not isinstance(arg, BaseClient)]
+            key = json.dumps([fn.__name__, key_args, kwargs, _scope(_client_region(args))],
+                             sort_keys=True, default=str)
+            path = CACHE_DIR / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+            try:
+                if time.time() - path.stat().st_mtime < ttl:
+                    with open(path) as f:
+                        return json.load(f, object_hook=_decode)
+            except (OSError, ValueError):
+                pass  # Missing or unreadable entry - fetch fresh
+
+            result = fn(*args, **kwargs)
+
+            try:
+                # Listings can name private resources, so keep them to the current user
+                CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+                CACHE_DIR.chmod(0o700)
+                tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(result, f, default=_encode)
+                os.replace(tmp_path, path)
+            except (OSError, TypeError) as e:
+                print(f"Warning: could not cache {fn.__name__}: {e}")
+
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Shared botocore client configuration for the debugging scripts.
+"""
+
+from botocore.config import Config
+
+# Adaptive retries back off on throttling instead of failing the check, and the
+# pool covers the scripts' thread-pool fan-out
+CLIENT_CONFIG = Config(
+    retries={'max_attempts': 8, 'mode': 'adaptive'},
+    max_pool_connections=32
+)
@@ -3,10 +3,15 @@
 Code coverage analysis script for the lab data digitization service.
 """
 
+import re
 import subprocess
 import sys
 import os
 
+# pytest-cov's terminal section, up to the warnings "-- Docs:" footer if any.
+# Older releases draw the header with dashes, newer ones with underscores.
+_COV_RE = re.compile(r"[-_]{5,}\s*coverage:(.*?)(?:--\s*Docs:|\Z)", re.S)
+
 
 def run_coverage():
     """Run pytest with coverage and generate reports."""
@@ -22,23 +27,28 @@ def run_coverage():
         "-v"
     ]
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    # Stream pytest output as it runs, keeping a copy to parse the summary from
+    output_lines = []
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+    ) as proc:
+        for line in proc.stdout:
+            sys.stdout.write(line)
+            output_lines.append(line)
+    output = "".join(output_lines)
     
-    if result.returncode == 0:
+    if proc.returncode == 0:
         print("✅ Tests passed!")
     else:
-        print("❌ Some tests failed:")
-        print(result.stdout)
-        print(result.stderr)
+        print("❌ Some tests failed (see output above)")
     
     print("\n📊 Coverage Report:")
-    coverage_section = "Coverage report not found"
-    if "---------- coverage:" in result.stdout:
-        parts = result.stdout.split("---------- coverage:")
-        if len(parts) > 1:
-            coverage_section = parts[1]
-            if "-- Docs:" in coverage_section:
-                coverage_section = coverage_section.split("-- Docs:")[0]
+    match = _COV_RE.search(output)
+    coverage_section = match.group(1) if match else "Coverage report not found"
     print(coverage_section.strip())
     
     # Check if HTML coverage report was generated
@@ -46,7 +56,7 @@ def run_coverage():
         print("\n📁 Detailed HTML coverage report generated at: htmlcov/index.html")
         print("   Open it in your browser to see line-by-line coverage")
     
-    return result.returncode == 0
+    return proc.returncode == 0
 
 
 def analyze_coverage_gaps():
@@ -5,107 +5,177 @@ Usage: python check_logs.py [--dev|--prod] [--recent|--last-run|--errors]
 """
 
 import boto3
+from botocore.exceptions import BotoCoreError, ClientError
 import argparse
-import json
+import re
 from datetime import datetime, timedelta
+from functools import lru_cache
 import time
 
+from aws_config import CLIENT_CONFIG
+
+# Errors listed individually by analyze_last_run
+MAX_SHOWN_ERRORS = 3
+
+# Compiled once: one pass per message instead of several substring scans
+ERROR_RE = re.compile(r'error', re.IGNORECASE)
+CLASSIFIER = re.compile(r'(?P<err>ERROR)|(?P<ok>(?i:success|completed))|(?P<start>Lambda invoked)')
+# Highest-priority match wins, as with the original if/elif chain
+CLASSIFIER_PREFIXES = (('err', "❌"), ('ok', "✅"), ('start', "🚀"))
+
+def _classify(message):
+    """Return the display prefix for a log message."""
+    kinds = {m.lastgroup for m in CLASSIFIER.finditer(message)}
+    for kind, prefix in CLASSIFIER_PREFIXES:
+        if kind in kinds:
+            return prefix
+    return "📝"
+
+@lru_cache(maxsize=4096)
+def _format_second(seconds, fmt):
+    return time.strftime(fmt, time.localtime(seconds))
+
+def _format_ms(timestamp_ms, fmt='%H:%M:%S'):
+    """Format an event timestamp (epoch ms) in local time, once per distinct second."""
+    return _format_second(timestamp_ms // 1000, fmt)
+
+def _insights_time(value):
+    """Parse an Insights @timestamp ('2024-01-31 12:34:56.789')."""
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f')
+
 class LogChecker:
-    def __init__(self, environment='dev'):
+    def __init__(self, environment='dev', session=None):
         self.environment = environment
-        self.logs_client = boto3.client('logs', region_name='us-west-2')
+        session = session or boto3.session.Session(region_name='us-west-2')
+        self.logs_client = session.client('logs', config=CLIENT_CONFIG)
         self.log_group = f'/aws/lambda/nanodrop-processor{"-dev" if environment == "dev" else ""}'
         
-    def get_recent_logs(self, minutes=30):
+    def _filter_events(self, start_time, end_time, max_events=None, **filter_args):
+        """Fetch every matching event in the window, following pagination."""
+        paginator = self.logs_client.get_paginator('filter_log_events')
+        pages = paginator.paginate(
+            logGroupName=self.log_group,
+            startTime=start_time,
+            endTime=end_time,
+            PaginationConfig={'MaxItems': max_events} if max_events else {},
+            **filter_args
+        )
+        events = []
+        for page in pages:
+            events.extend(page.get('events', []))
+        return events
+    
+    def get_recent_logs(self, minutes=30, max_events=None):
         """Get recent logs from the specified time range."""
         end_time = int(time.time() * 1000)
         start_time = end_time - (minutes * 60 * 1000)
         
         try:
-            response = self.logs_client.filter_log_events(
-                logGroupName=self.log_group,
-                startTime=start_time,
-                endTime=end_time
-            )
-            return response.get('events', [])
-        except Exception as e:
+            return self._filter_events(start_time, end_time, max_events)
+        except (ClientError, BotoCoreError) as e:
             print(f"❌ Error fetching logs: {e}")
             return []
     
-    def get_last_run_logs(self):
-        """Get logs from the most recent Lambda execution."""
-        # Look for recent START events to identify the last run
-        recent_events = self.get_recent_logs(minutes=60)
-        
-        # Find the most recent START event
-        start_events = [e for e in recent_events if 'START RequestId:' in e['message']]
-        if not start_events:
-            print("❌ No recent Lambda executions found")
-            return []
-        
-        # Get the request ID from the most recent START
-        last_start = start_events[-1]
-        request_id = last_start['message'].split('RequestId: ')[1].split(' ')[0]
-        
-        # Filter events for this specific request
-        run_events = [e for e in recent_events if request_id in e['message']]
-        return run_events, request_id
-    
-    def get_error_logs(self, hours=24):
+    def get_error_logs(self, hours=24, max_events=None):
         """Get error logs from the specified time range."""
         end_time = int(time.time() * 1000)
         start_time = end_time - (hours * 60 * 60 * 1000)
         
         try:
-            response = self.logs_client.filter_log_events(
-                logGroupName=self.log_group,
-                startTime=start_time,
-                endTime=end_time,
-                filterPattern='ERROR'
-            )
-            return response.get('events', [])
-        except Exception as e:
+            return self._filter_events(start_time, end_time, max_events, filterPattern='ERROR')
+        except (ClientError, BotoCoreError) as e:
             print(f"❌ Error fetching error logs: {e}")
             return []
     
-    def analyze_last_run(self):
+    def run_insights_query(self, query, start_time, end_time, poll_interval=1.0, timeout=60):
+        """
+        Run a CloudWatch Logs Insights query and return its rows as dicts.
+        
+        Filtering and JSON field extraction happen service-side, so only the
+        requested fields come back.
+        """
+        query_id = self.logs_client.start_query(
+            logGroupName=self.log_group,
+            startTime=start_time // 1000,
+            endTime=end_time // 1000,
+            queryString=query
+        )['queryId']
+        
+        deadline = time.time() + timeout
+        while True:
+            response = self.logs_client.get_query_results(queryId=query_id)
+            if response['status'] in ('Complete', 'Failed', 'Cancelled', 'Timeout'):
+                break
+            if time.time() > deadline:
+                self.logs_client.stop_query(queryId=query_id)
+                raise TimeoutError(f"Insights query did not finish within {timeout}s")
+            time.sleep(poll_interval)
+        
+        if response['status'] != 'Complete':
+            raise RuntimeError(f"Insights query {response['status'].lower()}")
+        
+        return [
+            {cell['field']: cell['value'] for cell in row if cell['field'] != '@ptr'}
+            for row in response['results']
+        ]
+    
+    def analyze_last_run(self, minutes=60):
         """Analyze the last Lambda run and show key metrics."""
-        result = self.get_last_run_logs()
-        if not result:
-            return
+        end_time = int(time.time() * 1000)
+        start_time = end_time - (minutes * 60 * 1000)
         
-        events, request_id = result
+        try:
+            last_start = self.run_insights_query(
+                "fields @requestId"
+                " | filter @message like /START RequestId:/"
+                " | sort @timestamp desc | limit 1",
+                start_time, end_time
+            )
+            if not last_start:
+                print("❌ No recent Lambda executions found")
+                return
+            request_id = last_start[0]['@requestId']
+            
+            events = self.run_insights_query(
+                "fields @timestamp, @message, message, success, total_duration_ms, samples_extracted, instrument"
+                f' | filter @requestId = "{request_id}" or @message like "{request_id}"'
+                " | sort @timestamp asc | limit 200",
+                start_time, end_time
+            )
+        except (ClientError, BotoCoreError, TimeoutError, RuntimeError) as e:
+            print(f"❌ Error querying logs: {e}")
+            return
         
         print(f"🔍 LAST RUN ANALYSIS ({self.environment.upper()})")
         print(f"{'='*60}")
         print(f"Request ID: {request_id}")
         
-        # Extract key information
+        # Extract key information (structured JSON fields are parsed by Insights)
         success = False
         processing_time = None
         samples_extracted = None
         instrument_type = None
-        errors = []
+        errors = []  # First MAX_SHOWN_ERRORS only
+        error_count = 0
         
         for event in events:
-            message = event['message']
+            message = event.get('@message', '').strip()
+            log_message = event.get('message', '')
             
-            # Parse structured logs
-            if message.strip().startswith('{'):
-                try:
-                    log_data = json.loads(message.strip())
-                    if log_data.get('message') == 'Request completed':
-                        success = log_data.get('success', False)
-                        processing_time = log_data.get('total_duration_ms')
-                        samples_extracted = log_data.get('samples_extracted')
-                    elif 'instrument' in log_data.get('message', ''):
-                        instrument_type = log_data.get('message', '').split(':')[1].strip() if ':' in log_data.get('message', '') else None
-                except:
-                    pass
+            if log_message == 'Request completed':
+                success = event.get('success') in ('1', 'true', 'True')
+                if event.get('total_duration_ms'):
+                    processing_time = float(event['total_duration_ms'])
+                if event.get('samples_extracted'):
+                    samples_extracted = int(float(event['samples_extracted']))
+            elif log_message == 'Detected instrument':
+                instrument_type = event.get('instrument')
             
             # Look for errors
-            if 'ERROR' in message or 'error' in message.lower():
-                errors.append(message.strip())
+            if ERROR_RE.search(message):
+                error_count += 1
+                if len(errors) < MAX_SHOWN_ERRORS:
+                    errors.append(message)
         
         # Show results
         print(f"Status: {'✅ Success' if success else '❌ Failed'}")
@@ -117,11 +187,11 @@ class LogChecker:
             print(f"Instrument: {instrument_type}")
         
         if errors:
-            print(f"\n⚠️  Errors ({len(errors)}):")
-            for error in errors[:3]:  # Show first 3 errors
+            print(f"\n⚠️  Errors ({error_count}):")
+            for error in errors:  # Show first 3 errors
                 print(f"  - {error}")
-            if len(errors) > 3:
-                print(f"  ... and {len(errors) - 3} more errors")
+            if error_count > len(errors):
+                print(f"  ... and {error_count - len(errors)} more errors")
         else:
             print(f"✅ No errors detected")
         
@@ -130,10 +200,10 @@ class LogChecker:
         # Show processing timeline
         if len(events) > 3:
             print(f"\n⏱️  Processing Timeline:")
-            start_time = events[0]['timestamp']
+            start_time = _insights_time(events[0]['@timestamp'])
             for event in events[:5]:  # Show first 5 events
-                relative_time = (event['timestamp'] - start_time) / 1000
-                message = event['message'].strip()
+                relative_time = (_insights_time(event['@timestamp']) - start_time).total_seconds()
+                message = event['@message'].strip()
                 if len(message) > 60:
                     message = message[:60] + "..."
                 print(f"  +{relative_time:5.1f}s: {message}")
@@ -150,20 +220,12 @@ class LogChecker:
         print("-" * 60)
         
         for event in events[-10:]:  # Show last 10 events
-            timestamp = datetime.fromtimestamp(event['timestamp'] / 1000)
             message = event['message'].strip()
             
             # Colorize based on content
-            if 'ERROR' in message:
-                prefix = "❌"
-            elif 'success' in message.lower() or 'completed' in message.lower():
-                prefix = "✅"
-            elif 'Lambda invoked' in message:
-                prefix = "🚀"
-            else:
-                prefix = "📝"
+            prefix = _classify(message)
             
-            print(f"{prefix} {timestamp.strftime('%H:%M:%S')} {message}")
+            print(f"{prefix} {_format_ms(event['timestamp'])} {message}")
     
     def show_errors(self, hours=24):
         """Show recent errors."""
@@ -177,9 +239,8 @@ class LogChecker:
         print("-" * 60)
         
         for error in errors[-5:]:  # Show last 5 errors
-            timestamp = datetime.fromtimestamp(error['timestamp'] / 1000)
             message = error['message'].strip()
-            print(f"🔥 {timestamp.strftime('%m/%d %H:%M:%S')} {message}")
+            print(f"🔥 {_format_ms(error['timestamp'], '%m/%d %H:%M:%S')} {message}")
 
 def main():
     parser = argparse.ArgumentParser(description='Check Nanodrop processor logs')
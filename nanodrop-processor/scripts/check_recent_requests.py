@@ -3,159 +3,274 @@
 Check recent Lambda invocations and DynamoDB logs to debug missing responses.
 """
 
+import argparse
 import boto3
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor
 import json
 from datetime import datetime, timedelta, timezone
 import sys
 import os
+from types import SimpleNamespace
 
-def check_cloudwatch_logs():
+from aws_cache import disable as disable_cache, disk_cache
+from aws_config import CLIENT_CONFIG
+
+# Bucket SES delivers incoming emails to
+NANODROP_BUCKET = os.environ.get('NANODROP_BUCKET', 'nanodrop-emails-seminalcapital')
+
+# GSI on the requests table: date_partition (YYYY-MM-DD) + timestamp
+REQUESTS_DATE_INDEX = 'date-partition-index'
+
+# Concurrent describe_log_streams / get_log_events calls
+LOGS_MAX_WORKERS = 16
+
+@disk_cache(ttl=300)
+def _list_log_groups(logs, prefix):
+    """All log groups under prefix (cached - describe_log_groups is throttled)."""
+    paginator = logs.get_paginator('describe_log_groups')
+    return [
+        group
+        for page in paginator.paginate(logGroupNamePrefix=prefix)
+        for group in page['logGroups']
+    ]
+
+@disk_cache(ttl=300)
+def _list_buckets(s3):
+    """All S3 buckets in the account (cached)."""
+    return s3.list_buckets()['Buckets']
+
+# The only list_functions fields cached; the rest (e.g. Environment) can hold secrets
+FUNCTION_SUMMARY_FIELDS = ('FunctionName', 'Runtime', 'PackageType', 'LastModified', 'State')
+
+@disk_cache(ttl=300)
+def _list_nanodrop_functions(lambda_client):
+    """Name, runtime, last-modified and state of Lambda functions with 'nanodrop' in their name (cached)."""
+    paginator = lambda_client.get_paginator('list_functions')
+    return [
+        {field: f[field] for field in FUNCTION_SUMMARY_FIELDS if field in f}
+        for page in paginator.paginate()
+        for f in page['Functions']
+        if 'nanodrop' in f['FunctionName'].lower()
+    ]
+
+def check_cloudwatch_logs(clients):
     """Check CloudWatch logs for recent Lambda invocations."""
     print("Checking CloudWatch logs...")
     
-    client = boto3.client('logs')
+    client = clients.logs
     
     # Look for Lambda log groups
     try:
-        log_groups = client.describe_log_groups(
-            logGroupNamePrefix='/aws/lambda/nanodrop'
-        )
+        log_groups = _list_log_groups(client, '/aws/lambda/nanodrop')
         
-        if not log_groups['logGroups']:
+        if not log_groups:
             print("No Lambda log groups found with prefix '/aws/lambda/nanodrop'")
             return
         
-        for log_group in log_groups['logGroups']:
-            group_name = log_group['logGroupName']
-            print(f"\nChecking log group: {group_name}")
+        cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+        start_ms = int(cutoff.timestamp() * 1000)
+        group_names = [group['logGroupName'] for group in log_groups]
+        
+        with ThreadPoolExecutor(max_workers=LOGS_MAX_WORKERS) as executor:
+            # Get recent log streams for every group at once
+            streams_by_group = executor.map(
+                lambda name: client.describe_log_streams(
+                    logGroupName=name,
+                    orderBy='LastEventTime',
+                    descending=True,
+                    limit=5
+                )['logStreams'],
+                group_names
+            )
             
-            # Get recent log streams
-            streams = client.describe_log_streams(
-                logGroupName=group_name,
-                orderBy='LastEventTime',
-                descending=True,
-                limit=5
+            pairs = []
+            for group_name, streams in zip(group_names, streams_by_group):
+                for stream in streams:
+                    # Streams with no events yet have no lastEventTime
+                    last_event_ms = stream.get('lastEventTime')
+                    if last_event_ms is None:
+                        continue
+                    last_event = datetime.fromtimestamp(last_event_ms / 1000, tz=timezone.utc)
+                    if last_event > cutoff:
+                        pairs.append((group_name, stream['logStreamName'], last_event))
+            
+            # Get the last 10 events of each recent stream concurrently
+            events_by_stream = executor.map(
+                lambda pair: client.get_log_events(
+                    logGroupName=pair[0],
+                    logStreamName=pair[1],
+                    startTime=start_ms,
+                    limit=10,
+                    startFromHead=False  # Newest page, i.e. the tail of the stream
+                )['events'],
+                pairs
             )
             
-            for stream in streams['logStreams']:
-                stream_name = stream['logStreamName']
-                last_event = datetime.fromtimestamp(stream['lastEventTime'] / 1000, tz=timezone.utc)
+            events_by_stream = dict(zip(((g, n) for g, n, _ in pairs), events_by_stream))
+        
+        for group_name in group_names:
+            print(f"\nChecking log group: {group_name}")
+            
+            for pair_group, stream_name, last_event in pairs:
+                if pair_group != group_name:
+                    continue
+                print(f"  Recent stream: {stream_name} (last event: {last_event})")
                 
-                if last_event > datetime.now(timezone.utc) - timedelta(days=7):
-                    print(f"  Recent stream: {stream_name} (last event: {last_event})")
-                    
-                    # Get recent events
-                    events = client.get_log_events(
-                        logGroupName=group_name,
-                        logStreamName=stream_name,
-                        startTime=int((datetime.now(timezone.utc) - timedelta(days=7)).timestamp() * 1000)
-                    )
-                    
-                    for event in events['events'][-10:]:  # Last 10 events
-                        timestamp = datetime.fromtimestamp(event['timestamp'] / 1000, tz=timezone.utc)
-                        message = event['message']
-                        print(f"    {timestamp}: {message[:100]}...")
-    
-    except Exception as e:
+                for event in events_by_stream[(group_name, stream_name)]:
+                    timestamp = datetime.fromtimestamp(event['timestamp'] / 1000, tz=timezone.utc)
+                    message = event['message']
+                    print(f"    {timestamp}: {message[:100]}...")
+    
+    except (ClientError, BotoCoreError) as e:
         print(f"Error checking CloudWatch logs: {e}")
 
-def check_dynamodb_requests():
+def _recent_requests(table, days, limit):
+    """
+    Return up to `limit` requests from the last `days` days, newest first.
+    
+    Queries the date_partition GSI one day at a time (today backwards), so only
+    the requested window is read. Falls back to a filtered scan for tables
+    created before the index existed.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=days)).isoformat()
+    
+    try:
+        items = []
+        for offset in range(days + 1):
+            day = (now - timedelta(days=offset)).strftime('%Y-%m-%d')
+            response = table.query(
+                IndexName=REQUESTS_DATE_INDEX,
+                KeyConditionExpression=Key('date_partition').eq(day) & Key('timestamp').gte(cutoff),
+                ScanIndexForward=False,
+                Limit=limit - len(items)
+            )
+            items.extend(response.get('Items', []))
+            if len(items) >= limit:
+                break
+        return items
+    except ClientError as e:
+        print(f"  Index query unavailable ({e.response['Error']['Code']}), scanning table instead")
+    
+    response = table.scan(
+        FilterExpression=Attr('timestamp').gte(cutoff),
+        Limit=limit
+    )
+    return sorted(response.get('Items', []), key=lambda x: x.get('timestamp', ''), reverse=True)
+
+def check_dynamodb_requests(clients):
     """Check DynamoDB for recent requests."""
     print("\nChecking DynamoDB for recent requests...")
     
-    dynamodb = boto3.resource('dynamodb')
+    dynamodb = clients.dynamodb
     
     # Try different table name patterns
     table_names = ['nanodrop-requests', 'dev-nanodrop-requests', 'prod-nanodrop-requests']
     
-    for table_name in table_names:
-        try:
-            table = dynamodb.Table(table_name)
-            table.table_status  # Test if table exists
-            
-            print(f"Found table: {table_name}")
-            
-            # Scan for recent requests (last 7 days)
-            response = table.scan(
-                FilterExpression=boto3.dynamodb.conditions.Attr('timestamp').gte(
-                    (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-                ),
-                Limit=20
-            )
-            
-            items = response.get('Items', [])
-            print(f"Found {len(items)} recent requests")
-            
-            for item in sorted(items, key=lambda x: x.get('timestamp', ''), reverse=True)[:10]:
-                timestamp = item.get('timestamp', 'Unknown')
-                user_email = item.get('user_email', 'Unknown')
-                success = item.get('success', 'Unknown')
-                error = item.get('error_message', 'No error')
-                samples = item.get('samples_extracted', 0)
-                
-                print(f"  {timestamp}: {user_email} - Success: {success}, Samples: {samples}")
-                if not success and error != 'No error':
-                    print(f"    Error: {error}")
-            
-            return  # Found a table, stop looking
-            
-        except Exception as e:
-            print(f"Table {table_name} not found or accessible: {e}")
+    # One ListTables walk instead of a DescribeTable probe per candidate
+    try:
+        paginator = dynamodb.meta.client.get_paginator('list_tables')
+        existing = {name for page in paginator.paginate() for name in page['TableNames']}
+    except (ClientError, BotoCoreError) as e:
+        print(f"Could not list DynamoDB tables: {e}")
+        return
+    
+    table_name = next((name for name in table_names if name in existing), None)
+    if table_name is None:
+        print("No DynamoDB tables found")
+        return
+    
+    print(f"Found table: {table_name}")
+    table = dynamodb.Table(table_name)
     
-    print("No DynamoDB tables found")
+    try:
+        # Newest requests from the last 7 days
+        items = _recent_requests(table, days=7, limit=20)
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error reading {table_name}: {e}")
+        return
+    
+    print(f"Found {len(items)} recent requests")
+    
+    for item in items[:10]:
+        timestamp = item.get('timestamp', 'Unknown')
+        user_email = item.get('user_email', 'Unknown')
+        success = item.get('success', 'Unknown')
+        error = item.get('error_message', 'No error')
+        samples = item.get('samples_extracted', 0)
+        
+        print(f"  {timestamp}: {user_email} - Success: {success}, Samples: {samples}")
+        if not success and error != 'No error':
+            print(f"    Error: {error}")
 
-def check_s3_emails():
+def _print_recent_emails(s3, bucket_name):
+    """Print emails received in the last 7 days under incoming/."""
+    response = s3.list_objects_v2(
+        Bucket=bucket_name,
+        Prefix='incoming/',
+        MaxKeys=20
+    )
+    
+    if 'Contents' in response:
+        recent_objects = sorted(
+            response['Contents'], 
+            key=lambda x: x['LastModified'], 
+            reverse=True
+        )[:10]
+        
+        for obj in recent_objects:
+            if obj['LastModified'] > datetime.now(timezone.utc) - timedelta(days=7):
+                print(f"  Recent email: {obj['Key']} ({obj['LastModified']})")
+
+def check_s3_emails(clients):
     """Check S3 for recent email objects."""
     print("\nChecking S3 for recent emails...")
     
-    s3 = boto3.client('s3')
+    s3 = clients.s3
+    
+    # Go straight to the known bucket; only list the account's buckets if it is gone
+    try:
+        print(f"Checking bucket: {NANODROP_BUCKET}")
+        _print_recent_emails(s3, NANODROP_BUCKET)
+        return
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error checking bucket {NANODROP_BUCKET}: {e}")
+        print("Searching for other email buckets...")
     
     # Try to find S3 buckets with email data
-    buckets = s3.list_buckets()
+    try:
+        buckets = _list_buckets(s3)
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error listing buckets: {e}")
+        return
     
-    for bucket in buckets['Buckets']:
+    for bucket in buckets:
         bucket_name = bucket['Name']
         
-        if 'nanodrop' in bucket_name.lower() or 'email' in bucket_name.lower():
+        if bucket_name != NANODROP_BUCKET and ('nanodrop' in bucket_name.lower() or 'email' in bucket_name.lower()):
             print(f"Checking bucket: {bucket_name}")
             
             try:
-                # Look for recent objects
-                response = s3.list_objects_v2(
-                    Bucket=bucket_name,
-                    Prefix='incoming/',
-                    MaxKeys=20
-                )
-                
-                if 'Contents' in response:
-                    recent_objects = sorted(
-                        response['Contents'], 
-                        key=lambda x: x['LastModified'], 
-                        reverse=True
-                    )[:10]
-                    
-                    for obj in recent_objects:
-                        if obj['LastModified'] > datetime.now(timezone.utc) - timedelta(days=7):
-                            print(f"  Recent email: {obj['Key']} ({obj['LastModified']})")
-                
-            except Exception as e:
+                _print_recent_emails(s3, bucket_name)
+            except (ClientError, BotoCoreError) as e:
                 print(f"Error checking bucket {bucket_name}: {e}")
 
-def check_lambda_function_config():
+def check_lambda_function_config(clients):
     """Check Lambda function configuration."""
     print("\nChecking Lambda function configuration...")
     
-    lambda_client = boto3.client('lambda')
+    lambda_client = clients.lambda_client
     
     try:
-        functions = lambda_client.list_functions()
-        
-        nanodrop_functions = [f for f in functions['Functions'] if 'nanodrop' in f['FunctionName'].lower()]
+        nanodrop_functions = _list_nanodrop_functions(lambda_client)
         
         for func in nanodrop_functions:
             func_name = func['FunctionName']
             print(f"\nFunction: {func_name}")
-            print(f"  Runtime: {func['Runtime']}")
+            # Container image functions have a PackageType but no Runtime
+            print(f"  Runtime: {func.get('Runtime', func.get('PackageType', 'Unknown'))}")
             print(f"  Last Modified: {func['LastModified']}")
             print(f"  State: {func.get('State', 'Unknown')}")
             
@@ -171,29 +286,50 @@ def check_lambda_function_config():
                 else:
                     print(f"    {key}: {value}")
     
-    except Exception as e:
+    except (ClientError, BotoCoreError) as e:
         print(f"Error checking Lambda functions: {e}")
 
+def make_clients(region_name='us-west-2'):
+    """Build every client the checks need from one session."""
+    session = boto3.session.Session(region_name=region_name)
+    return SimpleNamespace(
+        # CLIENT_CONFIG's pool is sized above LOGS_MAX_WORKERS
+        logs=session.client('logs', config=CLIENT_CONFIG),
+        s3=session.client('s3', config=CLIENT_CONFIG),
+        dynamodb=session.resource('dynamodb', config=CLIENT_CONFIG),
+        lambda_client=session.client('lambda', config=CLIENT_CONFIG),
+        sts=session.client('sts', config=CLIENT_CONFIG)
+    )
+
 def main():
     """Main investigation function."""
+    parser = argparse.ArgumentParser(description='Investigate missing nanodrop responses')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached AWS listings (cached for 5 minutes by default)')
+    args = parser.parse_args()
+    
+    if args.no_cache:
+        disable_cache()
+    
+    clients = make_clients()
+    
     print("Investigating missing nanodrop response")
     print("=" * 50)
     
     # Check AWS credentials
     try:
-        sts = boto3.client('sts')
-        identity = sts.get_caller_identity()
+        identity = clients.sts.get_caller_identity()
         print(f"AWS Account: {identity['Account']}")
         print(f"AWS User/Role: {identity['Arn']}")
-    except Exception as e:
+    except (ClientError, BotoCoreError) as e:
         print(f"AWS credentials issue: {e}")
         return
     
     # Run checks
-    check_lambda_function_config()
-    check_s3_emails()
-    check_dynamodb_requests()
-    check_cloudwatch_logs()
+    check_lambda_function_config(clients)
+    check_s3_emails(clients)
+    check_dynamodb_requests(clients)
+    check_cloudwatch_logs(clients)
     
     print("\n" + "=" * 50)
     print("Investigation complete. Check output above for issues.")
@@ -5,50 +5,109 @@ Usage: python download_latest_data.py [--latest] [--all] [--env dev|prod]
 """
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 import argparse
+import io
 import os
 import json
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from aws_config import CLIENT_CONFIG
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# How far back list_extractions walks the date-partitioned prefixes
+MAX_LOOKBACK_DAYS = 30
+
+# Concurrent downloads in download_all_recent
+DOWNLOAD_WORKERS = 10
 
 class DataDownloader:
     def __init__(self, environment='dev'):
         self.environment = environment
-        self.s3_client = boto3.client('s3')
+        # Keepalive so concurrent downloads reuse the pooled connections
+        self.s3_client = boto3.client('s3', config=CLIENT_CONFIG.merge(Config(tcp_keepalive=True)))
         self.bucket = 'nanodrop-emails-seminalcapital'
         self.prefix = f'debug/{environment}/' if environment == 'dev' else 'debug/'
         
-    def list_extractions(self, limit=10):
-        """List recent extraction files."""
+    def list_extractions(self, limit=10, max_days=MAX_LOOKBACK_DAYS):
+        """
+        List recent extraction files, newest first.
+        
+        Extractions are stored under extractions/YYYY/MM/DD/HHMMSS_..., so
+        each day prefix lists in time order. Walk back one day at a time
+        from today until `limit` files are found, then top up from the
+        flat extractions/ root used before keys were date-partitioned.
+        """
         try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket,
-                Prefix=f'{self.prefix}extractions/',
-                MaxKeys=limit * 2  # Get more to filter JSON files
-            )
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            today = datetime.now(timezone.utc)
+            json_files = []
             
-            objects = response.get('Contents', [])
-            json_files = [obj for obj in objects if obj['Key'].endswith('.json')]
+            for offset in range(max_days):
+                day = (today - timedelta(days=offset)).strftime('%Y/%m/%d')
+                day_files = [
+                    obj
+                    for page in paginator.paginate(
+                        Bucket=self.bucket,
+                        Prefix=f'{self.prefix}extractions/{day}/'
+                    )
+                    for obj in page.get('Contents', [])
+                    if obj['Key'].endswith('.json')
+                ]
+                json_files.extend(reversed(day_files))
+                if len(json_files) >= limit:
+                    break
             
-            # Sort by last modified (newest first)
-            json_files.sort(key=lambda x: x['LastModified'], reverse=True)
+            if len(json_files) < limit:
+                json_files.extend(self._list_legacy_extractions(paginator))
             
             return json_files[:limit]
             
-        except Exception as e:
+        except (ClientError, BotoCoreError) as e:
             print(f"❌ Error listing extractions: {e}")
             return []
     
+    def _list_legacy_extractions(self, paginator):
+        """Extractions saved directly under extractions/ (pre date-partitioning), newest first."""
+        legacy_files = [
+            obj
+            for page in paginator.paginate(
+                Bucket=self.bucket,
+                Prefix=f'{self.prefix}extractions/',
+                Delimiter='/'
+            )
+            for obj in page.get('Contents', [])
+            if obj['Key'].endswith('.json')
+        ]
+        return sorted(legacy_files, key=lambda obj: obj['LastModified'], reverse=True)
+    
     def download_file(self, s3_key, local_filename):
         """Download a file from S3."""
         try:
             self.s3_client.download_file(self.bucket, s3_key, local_filename)
             return True
-        except Exception as e:
+        except (ClientError, BotoCoreError, OSError) as e:
             print(f"❌ Error downloading {s3_key}: {e}")
             return False
     
-    def download_latest(self):
-        """Download the latest extraction data."""
+    def fetch_object(self, s3_key):
+        """Read an object into memory; returns its bytes, or None on error."""
+        buffer = io.BytesIO()
+        try:
+            self.s3_client.download_fileobj(self.bucket, s3_key, buffer)
+        except (ClientError, BotoCoreError) as e:
+            print(f"❌ Error downloading {s3_key}: {e}")
+            return None
+        return buffer.getvalue()
+    
+    def download_latest(self, save=True):
+        """Download the latest extraction data (save=False only prints its summary)."""
         extractions = self.list_extractions(limit=1)
         
         if not extractions:
@@ -63,9 +122,15 @@ class DataDownloader:
         print(f"   Last modified: {latest['LastModified']}")
         print(f"   Size: {latest['Size']} bytes")
         
-        success = self.download_file(s3_key, 'extracted_data.json')
+        # Fetch once into memory: the summary parses these bytes and the saved
+        # file is written from them, so nothing is read back from disk
+        raw = self.fetch_object(s3_key)
+        if raw is None:
+            return False
         
-        if success:
+        if save:
+            with open('extracted_data.json', 'wb') as f:
+                f.write(raw)
             print(f"✅ Downloaded to: extracted_data.json")
             
             # Also try to download corresponding CSV
@@ -74,11 +139,16 @@ class DataDownloader:
             
             if csv_success:
                 print(f"✅ Downloaded CSV to: extracted_data.csv")
+        
+        # Show basic info about the data
+        try:
+            data = orjson.loads(raw) if orjson else json.loads(raw)
+        except ValueError as e:
+            print(f"⚠️  Could not read data info: {e}")
+        else:
+            self.show_data_info(data)
             
-            # Show basic info about the data
-            self.show_data_info('extracted_data.json')
-            
-        return success
+        return True
     
     def download_all_recent(self, limit=5):
         """Download recent extraction files."""
@@ -90,12 +160,22 @@ class DataDownloader:
         
         print(f"📥 Downloading {len(extractions)} recent extractions...")
         
+        filenames = [
+            f"extraction_{i+1}_{os.path.basename(extraction['Key'])}"
+            for i, extraction in enumerate(extractions)
+        ]
+        
+        # Downloads are independent, so overlap them; results keep list order
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            results = list(executor.map(
+                self.download_file,
+                [extraction['Key'] for extraction in extractions],
+                filenames
+            ))
+        
         downloaded = 0
-        for i, extraction in enumerate(extractions):
-            s3_key = extraction['Key']
-            filename = f"extraction_{i+1}_{os.path.basename(s3_key)}"
-            
-            if self.download_file(s3_key, filename):
+        for i, (filename, ok) in enumerate(zip(filenames, results)):
+            if ok:
                 print(f"✅ {i+1}/{len(extractions)}: {filename}")
                 downloaded += 1
             else:
@@ -104,12 +184,9 @@ class DataDownloader:
         print(f"✅ Downloaded {downloaded}/{len(extractions)} files")
         return downloaded
     
-    def show_data_info(self, filename):
-        """Show basic information about downloaded data."""
+    def show_data_info(self, data):
+        """Show basic information about downloaded extraction data."""
         try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
-            
             print(f"\n📊 Data Summary:")
             print(f"   Request ID: {data.get('request_id', 'Unknown')}")
             print(f"   Timestamp: {data.get('timestamp', 'Unknown')}")
@@ -125,7 +202,7 @@ class DataDownloader:
             if processing_time > 0:
                 print(f"   Processing time: {processing_time/1000:.1f} seconds")
                 
-        except Exception as e:
+        except (AttributeError, TypeError) as e:
             print(f"⚠️  Could not read data info: {e}")
     
     def list_recent_files(self, limit=10):
@@ -168,6 +245,8 @@ def main():
     # Options
     parser.add_argument('--limit', type=int, default=5,
                         help='Number of files to download/list (default: 5)')
+    parser.add_argument('--no-save', action='store_true',
+                        help='Only print the latest extraction summary; do not write files')
     
     args = parser.parse_args()
     
@@ -181,7 +260,7 @@ def main():
         downloader.download_all_recent(args.limit)
     else:
         # Default: download latest
-        downloader.download_latest()
+        downloader.download_latest(save=not args.no_save)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -4,14 +4,59 @@ Simple monitoring script for Nanodrop processor.
 Shows system health, metrics, and recent activity.
 """
 
+import argparse
 import boto3
+from botocore.exceptions import BotoCoreError, ClientError
 import json
-from datetime import datetime, timedelta
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from aws_cache import disable as disable_cache, disk_cache, warm as warm_cache
+from aws_config import CLIENT_CONFIG
+
+# Days of activity shown per environment
+RECENT_DAYS = 5
+
+@disk_cache(ttl=60)
+def count_extractions(s3, bucket, prefix, day):
+    """Number and total size of extractions saved on day (YYYY/MM/DD), cached briefly."""
+    count = 0
+    size = 0
+    for page in s3.get_paginator('list_objects_v2').paginate(
+        Bucket=bucket,
+        Prefix=f'{prefix}extractions/{day}/'
+    ):
+        count += page['KeyCount']
+        size += sum(obj['Size'] for obj in page.get('Contents', []))
+    return {'count': count, 'size': size}
+
+@disk_cache(ttl=60)
+def count_legacy_extractions(s3, bucket, prefix, days):
+    """Per-day counts for extractions saved flat under extractions/ before date-partitioning."""
+    by_day = {day: {'count': 0, 'size': 0} for day in days}
+    for page in s3.get_paginator('list_objects_v2').paginate(
+        Bucket=bucket,
+        Prefix=f'{prefix}extractions/',
+        Delimiter='/'
+    ):
+        for obj in page.get('Contents', []):
+            day = obj['LastModified'].strftime('%Y/%m/%d')
+            if day in by_day:
+                by_day[day]['count'] += 1
+                by_day[day]['size'] += obj['Size']
+    return by_day
 
 def main():
-    s3 = boto3.client('s3')
-    logs = boto3.client('logs', region_name='us-west-2')
+    parser = argparse.ArgumentParser(description='Nanodrop processor monitoring')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached S3 listings (cached for 60 seconds by default)')
+    args = parser.parse_args()
+    
+    if args.no_cache:
+        disable_cache()
+    
+    session = boto3.session.Session(region_name='us-west-2')
+    s3 = session.client('s3', config=CLIENT_CONFIG)
     
     print("📊 NANODROP PROCESSOR MONITORING")
     print("=" * 60)
@@ -19,37 +64,44 @@ def main():
     # Check S3 data
     bucket = 'nanodrop-emails-seminalcapital'
     
-    # Count recent extractions
-    for env in ['dev', 'prod']:
-        prefix = f'debug/{env}/' if env == 'dev' else 'debug/'
-        
+    # Count recent extractions: one date-prefix listing per env and day, plus
+    # one listing of the legacy flat root per env, all in parallel
+    prefixes = {env: f'debug/{env}/' if env == 'dev' else 'debug/' for env in ['dev', 'prod']}
+    today = datetime.now(timezone.utc)
+    days = [(today - timedelta(days=offset)).strftime('%Y/%m/%d') for offset in range(RECENT_DAYS)]
+    
+    # Resolve the cache scope once here rather than racing for it in every worker
+    warm_cache(s3)
+    with ThreadPoolExecutor(max_workers=len(prefixes) * (len(days) + 1)) as executor:
+        futures = {
+            (env, day): executor.submit(count_extractions, s3, bucket, prefix, day)
+            for env, prefix in prefixes.items()
+            for day in days
+        }
+        legacy_futures = {
+            env: executor.submit(count_legacy_extractions, s3, bucket, prefix, days)
+            for env, prefix in prefixes.items()
+        }
+    
+    for env in prefixes:
         try:
-            response = s3.list_objects_v2(
-                Bucket=bucket,
-                Prefix=f'{prefix}extractions/',
-                MaxKeys=100
-            )
-            
-            objects = response.get('Contents', [])
-            
-            # Count by day
-            by_day = defaultdict(int)
-            total_size = 0
-            
-            for obj in objects:
-                day = obj['LastModified'].strftime('%Y-%m-%d')
-                by_day[day] += 1
-                total_size += obj['Size']
+            legacy = legacy_futures[env].result()
+            by_day = {}
+            for day in days:
+                counts = futures[(env, day)].result()
+                by_day[day] = {key: counts[key] + legacy[day][key] for key in ('count', 'size')}
+            total_count = sum(counts['count'] for counts in by_day.values())
+            total_size = sum(counts['size'] for counts in by_day.values())
             
             print(f"\n📁 {env.upper()} Environment:")
-            print(f"   Total extractions: {len(objects)}")
-            print(f"   Total size: {total_size / 1024 / 1024:.1f} MB")
+            print(f"   Extractions (last {RECENT_DAYS} days): {total_count}")
+            print(f"   Size (last {RECENT_DAYS} days): {total_size / 1024 / 1024:.1f} MB")
             print(f"   Recent activity:")
             
-            for day in sorted(by_day.keys(), reverse=True)[:5]:
-                print(f"      {day}: {by_day[day]} extractions")
+            for day in days:
+                print(f"      {day.replace('/', '-')}: {by_day[day]['count']} extractions")
                 
-        except Exception as e:
+        except (ClientError, BotoCoreError) as e:
             print(f"   ❌ Error: {e}")
     
     print("\n✅ Monitoring complete!")
@@ -4,22 +4,58 @@ Send test emails to the Nanodrop processor for testing.
 Usage: python send_test_email.py [--prod|--dev] [--image path/to/image.png]
 """
 
-import boto3
 import argparse
+import base64
 import os
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
 from email.mime.base import MIMEBase
 from email import encoders
+from email.policy import SMTP
 import mimetypes
 from datetime import datetime
+from functools import lru_cache
 
-def send_test_email(to_address, from_address, subject, body, attachment_path=None, cc_addresses=None, additional_to_addresses=None):
-    """Send a test email using AWS SES."""
+@lru_cache(maxsize=None)
+def _get_ses_client():
+    """
+    SES client shared by every send, so batches reuse one connection pool.
+    
+    boto3 is imported here rather than at module level so --help and argument
+    errors don't pay for loading it. Adaptive retries back off on SES
+    'Maximum sending rate exceeded' throttling.
+    """
+    import boto3
+    from aws_config import CLIENT_CONFIG
+    return boto3.client('ses', region_name='us-west-2', config=CLIENT_CONFIG)
+
+@lru_cache(maxsize=32)
+def _base64_file(attachment_path, mtime_ns, size):
+    """Base64 text of a file, cached per path and version so repeat sends skip encoding."""
+    # MIME needs the whole payload anyway; encodebytes wraps at 76 columns in one C call
+    with open(attachment_path, 'rb') as f:
+        return base64.encodebytes(f.read()).decode('ascii')
+
+def _encoded_attachment(attachment_path, maintype, subtype):
+    """Build a MIME part around the file's cached base64 text."""
+    stat = os.stat(attachment_path)
+    payload = _base64_file(os.path.abspath(attachment_path), stat.st_mtime_ns, stat.st_size)
+    
+    # Payload is already base64, so tell MIME not to encode it again
+    if maintype == 'image':
+        attachment = MIMEImage(payload, _subtype=subtype, _encoder=encoders.encode_noop)
+    else:
+        attachment = MIMEBase(maintype, subtype)
+        attachment.set_payload(payload)
+    attachment['Content-Transfer-Encoding'] = 'base64'
+    return attachment
+
+def send_test_email(to_address, from_address, subject, body, attachment_path=None, cc_addresses=None, additional_to_addresses=None, ses_client=None):
+    """Send a test email using AWS SES (through ses_client if given)."""
+    from botocore.exceptions import BotoCoreError, ClientError
     
-    # Create SES client
-    ses = boto3.client('ses', region_name='us-west-2')
+    client = ses_client or _get_ses_client()
     
     # Create message
     msg = MIMEMultipart()
@@ -49,14 +85,7 @@ def send_test_email(to_address, from_address, subject, body, attachment_path=Non
         
         maintype, subtype = ctype.split('/', 1)
         
-        # Read the attachment
-        with open(attachment_path, 'rb') as f:
-            if maintype == 'image':
-                attachment = MIMEImage(f.read(), _subtype=subtype)
-            else:
-                attachment = MIMEBase(maintype, subtype)
-                attachment.set_payload(f.read())
-                encoders.encode_base64(attachment)
+        attachment = _encoded_attachment(attachment_path, maintype, subtype)
         
         # Add header
         attachment.add_header(
@@ -74,10 +103,10 @@ def send_test_email(to_address, from_address, subject, body, attachment_path=Non
         if cc_addresses:
             destinations.extend(cc_addresses)
         
-        response = ses.send_raw_email(
+        response = client.send_raw_email(
             Source=from_address,
             Destinations=destinations,
-            RawMessage={'Data': msg.as_string()}
+            RawMessage={'Data': msg.as_bytes(policy=SMTP)}
         )
         print(f"✅ Email sent successfully!")
         print(f"   Message ID: {response['MessageId']}")
@@ -87,7 +116,15 @@ def send_test_email(to_address, from_address, subject, body, attachment_path=Non
         print(f"   From: {from_address}")
         if attachment_path:
             print(f"   Attachment: {os.path.basename(attachment_path)}")
-    except Exception as e:
+    except ClientError as e:
+        # Throttling is already retried with backoff by the client's adaptive
+        # retry mode; reaching here means the retries ran out
+        if e.response['Error']['Code'] in ('Throttling', 'TooManyRequestsException'):
+            print(f"❌ SES kept throttling after retries (lower --rate): {e}")
+        else:
+            print(f"❌ Error sending email: {e}")
+        return False
+    except BotoCoreError as e:
         print(f"❌ Error sending email: {e}")
         return False
     
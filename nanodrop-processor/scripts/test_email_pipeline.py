@@ -4,22 +4,63 @@ Comprehensive email testing pipeline for Nanodrop processor.
 Tests both production and development environments with various image types.
 """
 
-import boto3
 import argparse
 import os
 import time
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import cached_property
 from send_test_email import send_test_email
 
+# SES sandbox accounts allow 1 email/second; raise with --rate for production quotas
+DEFAULT_SEND_RATE = 1.0
+MAX_SEND_WORKERS = 8
+
+TEST_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+class RateLimiter:
+    """Token bucket that lets at most `rate` callers through per second."""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+    
+    def acquire(self):
+        """Block until the caller may proceed."""
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(self.next_slot, now) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
 class EmailPipelineTester:
     def __init__(self, environment='dev'):
         self.environment = environment
         self.to_address = 'nanodrop-dev@seminalcapital.net' if environment == 'dev' else 'nanodrop@seminalcapital.net'
         self.from_address = 'test@seminalcapital.net'
-        self.logs_client = boto3.client('logs', region_name='us-west-2')
-        self.s3_client = boto3.client('s3', region_name='us-west-2')
         self.log_group = f'/aws/lambda/nanodrop-processor{"-dev" if environment == "dev" else ""}'
+    
+    # AWS clients (and boto3 itself) are created on first use, so --help and
+    # argument errors stay fast
+    @cached_property
+    def log_checker(self):
+        from check_logs import LogChecker
+        return LogChecker(self.environment)
+    
+    @cached_property
+    def s3_client(self):
+        import boto3
+        return boto3.client('s3', region_name='us-west-2')
+    
+    @cached_property
+    def ses_client(self):
+        import boto3
+        from aws_config import CLIENT_CONFIG
+        return boto3.client('ses', region_name='us-west-2', config=CLIENT_CONFIG)
         
     def find_test_images(self, test_dir='images'):
         """Find all test images in the specified directory."""
@@ -29,75 +70,94 @@ class EmailPipelineTester:
         search_dirs = [test_dir, f'../{test_dir}', 'tests/fixtures/test_images', '../tests/fixtures/test_images']
         
         for dir_path in search_dirs:
-            if os.path.exists(dir_path):
-                for file in os.listdir(dir_path):
-                    if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        full_path = os.path.join(dir_path, file)
-                        test_images.append(full_path)
+            try:
+                with os.scandir(dir_path) as entries:
+                    test_images.extend(
+                        entry.path
+                        for entry in entries
+                        if entry.name.lower().endswith(TEST_IMAGE_EXTENSIONS) and entry.is_file()
+                    )
+            except (FileNotFoundError, NotADirectoryError):
+                pass  # Search location not present in this checkout
         
         return test_images
     
-    def send_test_batch(self, images, delay_between=5):
-        """Send a batch of test emails with different images."""
+    def _send_one(self, i, total, image_path, limiter):
+        """Send one test email, waiting for a send slot first."""
+        name = os.path.basename(image_path)
+        limiter.acquire()
+        subject = f"Test {i}/{total} - {name} - {datetime.now().strftime('%H:%M:%S')}"
+        
+        success = send_test_email(
+            to_address=self.to_address,
+            from_address=self.from_address,
+            subject=subject,
+            body=f"Automated test email {i} of {total}\\n\\nImage: {name}",
+            attachment_path=image_path,
+            ses_client=self.ses_client
+        )
+        
+        return {
+            'image': name,
+            'sent': success,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def send_test_batch(self, images, max_rate=DEFAULT_SEND_RATE):
+        """Send a batch of test emails with different images, at most max_rate per second."""
+        limiter = RateLimiter(max_rate)
         results = []
         
-        for i, image_path in enumerate(images, 1):
-            print(f"\n{'='*60}")
-            print(f"Test {i}/{len(images)}: {os.path.basename(image_path)}")
-            print(f"{'='*60}")
-            
-            subject = f"Test {i}/{len(images)} - {os.path.basename(image_path)} - {datetime.now().strftime('%H:%M:%S')}"
-            
-            success = send_test_email(
-                to_address=self.to_address,
-                from_address=self.from_address,
-                subject=subject,
-                body=f"Automated test email {i} of {len(images)}\\n\\nImage: {os.path.basename(image_path)}",
-                attachment_path=image_path
-            )
-            
-            results.append({
-                'image': os.path.basename(image_path),
-                'sent': success,
-                'timestamp': datetime.now().isoformat()
-            })
-            
-            if i < len(images):
-                print(f"⏱️  Waiting {delay_between} seconds before next email...")
-                time.sleep(delay_between)
+        # SES sends are I/O bound; the limiter, not the pool size, sets the pace
+        with ThreadPoolExecutor(max_workers=min(len(images), MAX_SEND_WORKERS) or 1) as executor:
+            futures = [
+                executor.submit(self._send_one, i, len(images), image_path, limiter)
+                for i, image_path in enumerate(images, 1)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                print(f"{'✅' if result['sent'] else '❌'} {result['image']}")
+                results.append(result)
         
         return results
     
     def check_logs_for_errors(self, start_time, duration_seconds=120):
         """Check CloudWatch logs for errors after sending emails."""
+        from botocore.exceptions import BotoCoreError, ClientError
+        
         print(f"\n🔍 Checking logs for errors...")
         
         end_time = start_time + (duration_seconds * 1000)
         
+        # Count and sample server-side rather than paging every ERROR event
         try:
-            response = self.logs_client.filter_log_events(
-                logGroupName=self.log_group,
-                startTime=start_time,
-                endTime=end_time,
-                filterPattern='ERROR'
+            counts = self.log_checker.run_insights_query(
+                "filter @message like /ERROR/ | stats count() as error_count",
+                start_time, end_time
             )
+            error_count = int(counts[0]['error_count']) if counts else 0
             
-            errors = response.get('events', [])
+            errors = self.log_checker.run_insights_query(
+                "fields @timestamp, @message"
+                " | filter @message like /ERROR/"
+                " | sort @timestamp asc | limit 5",
+                start_time, end_time
+            ) if error_count else []
             
             if errors:
-                print(f"❌ Found {len(errors)} errors in logs:")
-                for error in errors[:5]:  # Show first 5 errors
-                    print(f"   - {error['message'].strip()}")
+                print(f"❌ Found {error_count} errors in logs:")
+                for error in errors:  # First 5 errors
+                    print(f"   - {error['@message'].strip()}")
             else:
                 print("✅ No errors found in logs")
                 
             return errors
             
-        except Exception as e:
+        except (ClientError, BotoCoreError, TimeoutError, RuntimeError) as e:
             print(f"⚠️  Could not check logs: {e}")
             return []
     
-    def run_full_test(self, test_images=None):
+    def run_full_test(self, test_images=None, max_rate=DEFAULT_SEND_RATE):
         """Run a full test suite."""
         print(f"\n🧪 NANODROP EMAIL PIPELINE TEST")
         print(f"📍 Environment: {self.environment.upper()}")
@@ -127,7 +187,7 @@ class EmailPipelineTester:
         
         # Send test emails
         print(f"\n📤 Sending {len(test_images)} test emails...")
-        results = self.send_test_batch(test_images)
+        results = self.send_test_batch(test_images, max_rate)
         
         # Summary
         print(f"\n📊 TEST SUMMARY")
@@ -163,10 +223,12 @@ def main():
     parser.add_argument('--images', nargs='+', help='Specific image files to test')
     parser.add_argument('--quick', action='store_true', 
                         help='Quick test with just one image')
-    parser.add_argument('--delay', type=int, default=5,
-                        help='Delay between emails in seconds (default: 5)')
+    parser.add_argument('--rate', type=float, default=DEFAULT_SEND_RATE,
+                        help=f'Maximum emails sent per second (default: {DEFAULT_SEND_RATE:g})')
     
     args = parser.parse_args()
+    if not args.rate > 0:
+        parser.error('--rate must be a positive number')
     
     # Create tester
     tester = EmailPipelineTester(environment=args.env)
@@ -182,7 +244,7 @@ def main():
         test_images = None  # Test all found images
     
     # Run tests
-    tester.run_full_test(test_images)
+    tester.run_full_test(test_images, args.rate)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
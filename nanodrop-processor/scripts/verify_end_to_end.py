@@ -7,6 +7,14 @@ import json
 import csv
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Every well of a 96-well plate, A1..H12
+EXPECTED_WELLS = frozenset(f"{row}{col}" for row in 'ABCDEFGH' for col in range(1, 13))
+
 def verify_latest_test():
     """Verify the latest test files are correct."""
     print("🔍 END-TO-END VERIFICATION")
@@ -24,8 +32,8 @@ def verify_latest_test():
     print("✅ Both extraction JSON and CSV files found")
     
     # Load extraction data
-    with open('latest_extraction.json', 'r') as f:
-        extraction = json.load(f)
+    with open('latest_extraction.json', 'rb') as f:
+        extraction = orjson.loads(f.read()) if orjson else json.load(f)
     
     # Verify extraction structure
     expected_keys = ['request_id', 'timestamp', 'user_email', 'extracted_data']
@@ -53,19 +61,24 @@ def verify_latest_test():
     
     print(f"✅ Extracted {len(samples)} samples (complete 96-well plate)")
     
-    # Verify CSV structure
-    with open('latest_test.csv', 'r') as f:
+    # Verify CSV structure in one pass: keep the header and well names, count rows
+    with open('latest_test.csv', 'r', newline='') as f:
         csv_reader = csv.reader(f)
-        rows = list(csv_reader)
-    
-    if len(rows) != 97:  # 96 wells + header
-        print(f"❌ Expected 97 CSV rows (header + 96 wells), got {len(rows)}")
+        headers = next(csv_reader, None)
+        wells_in_csv = set()
+        row_count = 0 if headers is None else 1
+        for row in csv_reader:
+            row_count += 1
+            if row:
+                wells_in_csv.add(row[0])
+    
+    if row_count != 97:  # 96 wells + header
+        print(f"❌ Expected 97 CSV rows (header + 96 wells), got {row_count}")
         return False
     
     print("✅ CSV has correct number of rows (96 wells + header)")
     
     # Check CSV headers
-    headers = rows[0]
     expected_headers = ['Well', 'Value', 'Quality Assessment', 'Assay Type']
     if headers != expected_headers:
         print(f"❌ CSV headers incorrect. Expected {expected_headers}, got {headers}")
@@ -74,10 +87,7 @@ def verify_latest_test():
     print("✅ CSV headers are correct")
     
     # Verify all wells are present
-    wells_in_csv = set(row[0] for row in rows[1:])
-    expected_wells = set(f"{row}{col}" for row in 'ABCDEFGH' for col in range(1, 13))
-    
-    missing_wells = expected_wells - wells_in_csv
+    missing_wells = EXPECTED_WELLS - wells_in_csv
     if missing_wells:
         print(f"❌ Missing wells in CSV: {sorted(missing_wells)}")
         return False
@@ -58,15 +58,18 @@ class DynamoDBManager:
             return False
         
         try:
+            # One clock read per request so the record, its partition and the
+            # user stats all agree (and a midnight rollover can't split them)
+            now = datetime.now(timezone.utc)
             item = {
                 'request_id': request_id,
                 'user_email': user_email,
-                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'timestamp': now.isoformat(),
                 'images_processed': images_processed,
                 'samples_extracted': samples_extracted,
                 'processing_time_ms': processing_time_ms,
                 'success': success,
-                'date_partition': datetime.now(timezone.utc).strftime('%Y-%m-%d')
+                'date_partition': now.strftime('%Y-%m-%d')
             }
             
             if error_message:
@@ -81,7 +84,7 @@ class DynamoDBManager:
             self.requests_table.put_item(Item=item)
             
             # Update user stats (aggregation)
-            self._update_user_stats(user_email, success, processing_time_ms, samples_extracted, instrument_types)
+            self._update_user_stats(user_email, success, processing_time_ms, samples_extracted, instrument_types, now)
             
             return True
             
@@ -90,13 +93,16 @@ class DynamoDBManager:
             return False
     
     def _update_user_stats(self, user_email: str, success: bool, processing_time_ms: int, 
-                          samples_extracted: int, instrument_types: Optional[List[str]] = None):
+                          samples_extracted: int, instrument_types: Optional[List[str]] = None,
+                          now: Optional[datetime] = None):
         """Update aggregated user statistics."""
         if not self.user_stats_table:
             return
         
         try:
-            today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+            now = now or datetime.now(timezone.utc)
+            today = now.strftime('%Y-%m-%d')
+            now_iso = now.isoformat()
             
             # Try to get existing stats for today
             response = self.user_stats_table.get_item(
@@ -140,12 +146,12 @@ class DynamoDBManager:
                     'avg_processing_time_ms': processing_time_ms,
                     'success_rate': 1.0 if success else 0.0,
                     'instrument_types_used': instrument_types or [],
-                    'first_request_timestamp': datetime.now(timezone.utc).isoformat(),
-                    'last_request_timestamp': datetime.now(timezone.utc).isoformat()
+                    'first_request_timestamp': now_iso,
+                    'last_request_timestamp': now_iso
                 }
             
             # Always update the last request timestamp
-            item['last_request_timestamp'] = datetime.now(timezone.utc).isoformat()
+            item['last_request_timestamp'] = now_iso
             
             # Save updated stats
             self.user_stats_table.put_item(Item=item)
@@ -8,17 +8,25 @@ import os
 import json
 import boto3
 import email
+import hashlib
+from email.parser import BytesParser
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 import base64
 from io import BytesIO
-import openai
 from datetime import datetime
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from security_config import SecurityConfig
 from structured_logger import logger
 from dynamodb_schema import DynamoDBManager
@@ -35,14 +43,15 @@ from services.llm_service import (
     get_openai_client as service_get_openai_client,
     normalize_unicode_headers as service_normalize_unicode_headers,
     extract_lab_data as service_extract_lab_data,
+    extract_lab_data_batch as service_extract_lab_data_batch,
     merge_lab_results as service_merge_lab_results,
     merge_nanodrop_results_old as service_merge_nanodrop_results_old,
     fallback_merge as service_fallback_merge,
 )
 
-# Initialize AWS clients
+# Initialize AWS clients (SES is created on first send; many invocations never email)
 s3 = boto3.client('s3')
-ses = boto3.client('ses', region_name='us-west-2')
+ses = None
 
 # Get environment configuration
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'prod')
@@ -67,12 +76,20 @@ def generate_csv(data):
     return service_generate_csv(data)
 
 
+def get_ses():
+    """Get or create the SES client."""
+    global ses
+    if ses is None:
+        ses = boto3.client('ses', region_name='us-west-2')
+    return ses
+
+
 def send_success_email(recipients, csv_content, data, original_images):
-    return service_send_success_email(ses, recipients, csv_content, data, original_images)
+    return service_send_success_email(get_ses(), recipients, csv_content, data, original_images)
 
 
 def send_error_email(to_email, error_message):
-    return service_send_error_email(ses, to_email, error_message)
+    return service_send_error_email(get_ses(), to_email, error_message)
 
 
 def get_openai_client():
@@ -92,6 +109,98 @@ def _extract_email_address(raw_address):
     return raw_address.strip()
 
 
+def _dump_debug_json(data):
+    """Pretty-printed JSON bytes for the S3 debug copy of an extraction."""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+def _extract_attachment(attachment):
+    """Run GPT-4o extraction on a single attachment dict."""
+    image_data = attachment.get('data')
+    if not image_data:
+        raise ValueError("Attachment missing image bytes")
+    return extract_lab_data(image_data)
+
+
+def _extract_batch(image_attachments):
+    """
+    Extract one combined result from all attachments in a single GPT-4o call.
+    
+    Returns None if the batch request fails so the caller can fall back to
+    per-image extraction.
+    """
+    image_bytes_list = [attachment.get('data') for attachment in image_attachments]
+    if not all(image_bytes_list):
+        return None
+    
+    try:
+        logger.info("Processing images in one batch", total_images=len(image_bytes_list))
+        lab_data = extract_lab_data_batch(image_bytes_list)
+        if not lab_data.get('samples'):
+            raise ValueError("Batch result contained no samples")
+        logger.info("Batch extraction complete",
+                   total_images=len(image_bytes_list),
+                   samples_extracted=len(lab_data.get('samples', [])))
+        return lab_data
+    except Exception as e:
+        logger.warning("Batch extraction failed, processing images individually", error=str(e))
+        return None
+
+
+def _extract_all_images(image_attachments):
+    """
+    Extract lab data from all attachments concurrently.
+    
+    Each OpenAI call is network-bound, so the requests are issued in parallel
+    and the wall time is that of the slowest image rather than the sum.
+    Results stay in attachment order; a failed image is logged and skipped.
+    
+    Returns (results_list, processed_images, error_messages).
+    """
+    results_list = []
+    processed_images = []
+    error_messages = []
+    total_images = len(image_attachments)
+    
+    with ThreadPoolExecutor(max_workers=max(total_images, 1)) as executor:
+        futures = []
+        for i, attachment in enumerate(image_attachments, 1):
+            logger.info("Processing image", image_number=i, total_images=total_images)
+            futures.append(executor.submit(_extract_attachment, attachment))
+        
+        for i, (attachment, future) in enumerate(zip(image_attachments, futures), 1):
+            try:
+                lab_data = future.result()
+                results_list.append(lab_data)
+                processed_images.append(attachment['data'])
+                
+                # Log successful image processing
+                samples_in_image = len(lab_data.get('samples', []))
+                logger.image_processed(
+                    image_number=i,
+                    total_images=total_images,
+                    success=True,
+                    samples_extracted=samples_in_image
+                )
+                
+            except Exception as e:
+                error_msg = str(e)
+                logger.error(f"Error processing image {i}", error_message=error_msg)
+                error_messages.append(f"Image {i}: {error_msg}")
+                
+                # Log failed image processing
+                logger.image_processed(
+                    image_number=i,
+                    total_images=total_images,
+                    success=False,
+                    error_message=error_msg
+                )
+    
+    return results_list, processed_images, error_messages
+
+
 def lambda_handler(event, context):
     """Main Lambda handler - processes emails from S3."""
     # Set up logging context
@@ -109,12 +218,9 @@ def lambda_handler(event, context):
         # Start timing for analytics
         processing_start_time = time.time()
         
-        # Download email from S3
+        # Download email from S3 and parse it straight off the response stream
         email_obj = s3.get_object(Bucket=bucket, Key=key)
-        email_content = email_obj['Body'].read()
-        
-        # Parse email
-        msg = email.message_from_bytes(email_content)
+        msg = BytesParser().parse(email_obj['Body'])
         from_email = msg['From']
         subject = msg['Subject']
         envelope_sender = _extract_email_address(msg.get('Return-Path'))
@@ -249,46 +355,19 @@ def lambda_handler(event, context):
                 'body': json.dumps(f'Attachment validation failed: {sanitized_error}')
             }
         
+        # Dedupe only after validation so repeated copies still count toward the attachment limit
+        image_attachments = _dedupe_attachments(image_attachments)
         logger.info("Images found", image_count=len(image_attachments))
         
-        # Process each image with GPT-4o
-        results_list = []
-        processed_images = []
-        error_messages = []
-        
-        for i, attachment in enumerate(image_attachments, 1):
-            try:
-                logger.info("Processing image", image_number=i, total_images=len(image_attachments))
-                image_data = attachment.get('data')
-                if not image_data:
-                    raise ValueError("Attachment missing image bytes")
-                lab_data = extract_lab_data(image_data)
-                results_list.append(lab_data)
-                processed_images.append(image_data)
-                
-                # Log successful image processing
-                samples_in_image = len(lab_data.get('samples', []))
-                logger.image_processed(
-                    image_number=i,
-                    total_images=len(image_attachments),
-                    success=True,
-                    samples_extracted=samples_in_image
-                )
-                
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"Error processing image {i}", error_message=error_msg)
-                error_messages.append(f"Image {i}: {error_msg}")
-                
-                # Log failed image processing
-                logger.image_processed(
-                    image_number=i,
-                    total_images=len(image_attachments),
-                    success=False,
-                    error_message=error_msg
-                )
-                # Continue with other images
-                continue
+        # Process images with GPT-4o: one batched call for multi-image emails,
+        # falling back to per-image extraction (and an LLM merge) if it fails
+        batch_result = _extract_batch(image_attachments) if len(image_attachments) > 1 else None
+        if batch_result is not None:
+            results_list = [batch_result]
+            processed_images = [attachment['data'] for attachment in image_attachments]
+            error_messages = []
+        else:
+            results_list, processed_images, error_messages = _extract_all_images(image_attachments)
         
         if not results_list:
             # Provide helpful error message for extraction failure
@@ -350,11 +429,15 @@ def lambda_handler(event, context):
         csv_content = generate_csv(combined_data)
         
         # Save extracted data and CSV to S3 for accuracy analysis
+        # Keys are date-partitioned (YYYY/MM/DD/HHMMSS_...) so a prefix listing
+        # comes back in time order and scripts can walk day by day
         debug_prefix = f"debug/{ENVIRONMENT}/" if ENVIRONMENT else "debug/"
-        timestamp_str = int(time.time())
+        saved_at = time.gmtime()
+        date_path = time.strftime('%Y/%m/%d', saved_at)
+        time_str = time.strftime('%H%M%S', saved_at)
         
         # Save raw extracted data as JSON
-        json_key = f"{debug_prefix}extractions/{request_id}_{timestamp_str}_raw_data.json"
+        json_key = f"{debug_prefix}extractions/{date_path}/{time_str}_{request_id}_raw_data.json"
         json_data = {
             "request_id": request_id,
             "timestamp": datetime.now().isoformat(),
@@ -366,13 +449,13 @@ def lambda_handler(event, context):
         s3.put_object(
             Bucket=bucket, 
             Key=json_key, 
-            Body=json.dumps(json_data, indent=2), 
+            Body=_dump_debug_json(json_data), 
             ContentType='application/json'
         )
         logger.info("Raw extraction data saved", debug_json_key=json_key)
         
         # Save CSV for comparison
-        csv_key = f"{debug_prefix}csv/{request_id}_{timestamp_str}.csv"
+        csv_key = f"{debug_prefix}csv/{date_path}/{time_str}_{request_id}.csv"
         s3.put_object(Bucket=bucket, Key=csv_key, Body=csv_content, ContentType='text/csv')
         logger.info("CSV data saved", debug_csv_key=csv_key)
         
@@ -446,26 +529,19 @@ def lambda_handler(event, context):
         }
 
 
-ALLOWED_IMAGE_CONTENT_TYPES = {'image/jpeg', 'image/png', 'image/jpg'}
-
-
-def extract_image_from_email(msg):
-    """Extract first image attachment from email."""
-    images = extract_images_from_email(msg)
-    if images:
-        return images[0].get('data')
-    return None
+ALLOWED_IMAGE_CONTENT_TYPES = frozenset({'image/jpeg', 'image/png', 'image/jpg'})
 
 
 def extract_images_from_email(msg):
     """Extract all image attachments from email with MIME metadata."""
     images = []
     for part in msg.walk():
+        # Only decode the payload of parts we are actually going to keep
         content_type = part.get_content_type()
-        if content_type in ALLOWED_IMAGE_CONTENT_TYPES:
-            image_data = part.get_payload(decode=True)
-            if not image_data:
-                continue
+        if content_type not in ALLOWED_IMAGE_CONTENT_TYPES:
+            continue
+        image_data = part.get_payload(decode=True)
+        if image_data:
             images.append({
                 'content_type': content_type,
                 'data': image_data,
@@ -474,10 +550,30 @@ def extract_images_from_email(msg):
     return images
 
 
+def _dedupe_attachments(image_attachments):
+    """Drop attachments whose bytes repeat an earlier one (e.g. inline + attached copies)."""
+    seen = set()
+    unique = []
+    for attachment in image_attachments:
+        digest = hashlib.sha256(attachment['data']).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        unique.append(attachment)
+    if len(unique) < len(image_attachments):
+        logger.info("Skipped duplicate image attachments",
+                   duplicates=len(image_attachments) - len(unique))
+    return unique
+
+
 def extract_lab_data(image_bytes):
     return service_extract_lab_data(image_bytes)
 
 
+def extract_lab_data_batch(image_bytes_list):
+    return service_extract_lab_data_batch(image_bytes_list)
+
+
 def merge_lab_results(results_list):
     return service_merge_lab_results(results_list)
 
@@ -2,6 +2,7 @@
 """CSV generation and quality assessment helpers."""
 
 import csv
+from functools import lru_cache
 from io import StringIO
 from typing import Any, Dict, List
 
@@ -29,10 +30,16 @@ def _safe_float(value):
 
 
 def assess_quality(a260_a280, a260_a230, concentration):
-    ratio_260_280 = _safe_float(a260_a280)
-    ratio_260_230 = _safe_float(a260_a230)
-    concentration_val = _safe_float(concentration)
+    return _quality_summary(
+        _safe_float(a260_a280),
+        _safe_float(a260_a230),
+        _safe_float(concentration),
+    )
 
+
+@lru_cache(maxsize=1024)
+def _quality_summary(ratio_260_280, ratio_260_230, concentration_val):
+    """Build the assessment string for parsed values (cached, readings repeat often)."""
     issues: List[str] = []
 
     if concentration_val is None:
@@ -61,11 +68,6 @@ def assess_quality(a260_a280, a260_a230, concentration):
     else:
         issues.append("260/230 ratio missing")
 
-    if ratio_260_280 is not None:
-        issues = [msg for msg in issues if msg != "260/280 ratio missing"]
-    if ratio_260_230 is not None:
-        issues = [msg for msg in issues if msg != "260/230 ratio missing"]
-
     return " ; ".join(issues) if issues else "Good quality"
 
 
@@ -207,11 +209,12 @@ def generate_csv(data: Dict[str, Any]) -> str:
         mode = 'dynamic'
 
     writer.writerow(headers)
+    rows = []
 
     def _write_row(row):
         if len(row) > len(headers):
             row = row[:len(headers)]
-        writer.writerow(_sanitize_csv_row(row))
+        rows.append(_sanitize_csv_row(row))
 
     if mode == 'plate':
         extracted_data = {}
@@ -224,6 +227,7 @@ def generate_csv(data: Dict[str, Any]) -> str:
                 value = extracted_data.get(well, 'not extracted')
                 quality = 'Check manually' if well in extracted_data else 'Manual entry required'
                 _write_row([well, value, quality, assay_type])
+        writer.writerows(rows)
         return output.getvalue()
 
     for sample in samples:
@@ -263,4 +267,5 @@ def generate_csv(data: Dict[str, Any]) -> str:
             row.append(assay_type)
         _write_row(row)
 
+    writer.writerows(rows)
     return output.getvalue()
@@ -5,10 +5,19 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import List, Sequence
+from email.policy import SMTP
+from typing import List, Sequence, Union
 
 from structured_logger import logger
 
+SUCCESS_EMAIL_FOOTER = """
+
+The detailed results are attached as a CSV file, along with your original image(s) for reference.
+
+--
+Lab Data Digitization Service
+"""
+
 
 def slugify_label(value, fallback="lab_data"):
     if not value:
@@ -57,18 +66,19 @@ ANALYSIS SUMMARY:
 
 SAMPLE RESULTS:
 """
+    lines = [body]
     for i, sample in enumerate(samples, 1):
         sample_id = sample.get('#', sample.get('sample_number', f'Sample {i}'))
         concentration = sample.get('ng/μL', sample.get('ng/uL', sample.get('ng/無', sample.get('concentration', 'N/A'))))
         a260_280 = sample.get('A260/A280', sample.get('a260_a280'))
         a260_230 = sample.get('A260/A230', sample.get('a260_a230'))
         if isinstance(concentration, (int, float)) and concentration < 0:
-            body += f"    {sample_id}: INVALID (negative value: {concentration})\n"
+            lines.append(f"    {sample_id}: INVALID (negative value: {concentration})\n")
         elif a260_280 and a260_230:
-            body += f"    {sample_id}: {concentration} ng/uL (260/280: {a260_280}, 260/230: {a260_230})\n"
+            lines.append(f"    {sample_id}: {concentration} ng/uL (260/280: {a260_280}, 260/230: {a260_230})\n")
         else:
-            body += f"    {sample_id}: {concentration}\n"
-    return body
+            lines.append(f"    {sample_id}: {concentration}\n")
+    return "".join(lines)
 
 
 def _build_plate_body(instrument_label, sample_count, samples):
@@ -82,19 +92,20 @@ The detailed results are attached as a complete 96-well CSV. Wells not extracted
 
 Data Preview (first 5 wells):
 """
+    lines = [body]
     for i, sample in enumerate(samples[:5], 1):
         well = sample.get('well', f'Sample {i}')
         value = sample.get('value', 'N/A')
-        body += f"    {well}: {value}\n"
+        lines.append(f"    {well}: {value}\n")
     if sample_count > 5:
-        body += f"    ... and {sample_count - 5} more wells (see CSV for complete data)\n"
-    return body
+        lines.append(f"    ... and {sample_count - 5} more wells (see CSV for complete data)\n")
+    return "".join(lines)
 
 
 def send_success_email(
     ses_client,
     recipients: Sequence[str],
-    csv_content: str,
+    csv_content: Union[str, bytes],
     data,
     original_images: Sequence[bytes],
 ):
@@ -134,17 +145,15 @@ def send_success_email(
     else:
         body = _build_standard_body(instrument_label, assay_type, image_count, sample_count, commentary, data['samples'])
 
-    body += """
-
-The detailed results are attached as a CSV file, along with your original image(s) for reference.
-
---
-Lab Data Digitization Service
-"""
+    body += SUCCESS_EMAIL_FOOTER
 
     msg.attach(MIMEText(body, 'plain'))
 
-    csv_attachment = MIMEBase('text', 'csv')
+    # Hand the encoder UTF-8 bytes; a str payload is encoded as
+    # raw-unicode-escape, which mangles units such as "ng/μL"
+    if isinstance(csv_content, str):
+        csv_content = csv_content.encode('utf-8')
+    csv_attachment = MIMEBase('text', 'csv', charset='utf-8')
     csv_attachment.set_payload(csv_content)
     encoders.encode_base64(csv_attachment)
     csv_attachment.add_header(
@@ -172,7 +181,9 @@ Lab Data Digitization Service
     ses_client.send_raw_email(
         Source=msg['From'],
         Destinations=recipients,
-        RawMessage={'Data': msg.as_string()}
+        # Serialize straight to bytes; as_string() would build the whole
+        # base64-encoded message as a str and SES would then re-encode it
+        RawMessage={'Data': msg.as_bytes(policy=SMTP)}
     )
 
 
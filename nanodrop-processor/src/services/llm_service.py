@@ -3,16 +3,159 @@
 
 import os
 import json
-import base64
+import re
 import time
+from itertools import chain
+from operator import itemgetter
 from typing import Any, Dict, List
-import openai
+
+try:
+    # SIMD-accelerated drop-in replacement for the stdlib encoder
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    # Rust-backed JSON codec; its decode errors subclass json.JSONDecodeError
+    import orjson
+except ImportError:
+    orjson = None
 
 from structured_logger import logger
 
 # Global OpenAI client (lazy initialization)
 openai_client = None
 
+# Keep idle connections to the API open across warm invocations (httpx's
+# default expiry is 5s), so repeat calls skip the TCP+TLS handshake.
+OPENAI_KEEPALIVE_CONNECTIONS = 8
+OPENAI_KEEPALIVE_EXPIRY = 300
+
+# At "high" detail the vision API fits images into 2048x2048 and then scales
+# the short side down to 768px, so larger uploads only add bytes and latency.
+VISION_MAX_LONG_SIDE = 2048
+VISION_MAX_SHORT_SIDE = 768
+
+# Static prompts and schemas are built once at import, not on every request
+EXTRACTION_PROMPT = """
+    Extract ALL data from this lab instrument image.
+
+    For standard tables (Nanodrop, UV-Vis, etc.):
+    - Extract exact column headers and all row data
+    - Use ASCII-safe units: "ng/uL" instead of "ng/μL", "deg" instead of "°"
+
+    For 96-well plates:
+    - Extract well positions (A1, B2, etc.) and values
+    - Also provide in long form: [{"well": "A1", "value": X}, ...]
+
+    Return JSON:
+    {
+        "instrument": "detected instrument type",
+        "confidence": "high|medium|low",
+        "is_plate_format": true/false,
+        "columns": ["headers"] (if table format),
+        "samples": [{"col1": "val1", ...}] or [{"well": "A1", "value": X}],
+        "plate_data": {"A1": value, ...} (if plate format),
+        "notes": "any relevant observations"
+    }
+
+    Extract all visible data precisely. Use scientific notation if shown (e.g., 1.23E+04).
+    IMPORTANT: Use ASCII-safe characters only in column headers and units.
+    """
+
+BATCH_EXTRACTION_PROMPT = """
+    The attached images are photos of the same instrument run, e.g. several pages or
+    scroll positions of one results table. Combine them into ONE result:
+    - Include every sample exactly once; if a sample appears in more than one image,
+      keep the clearest, most plausible reading (avoid negative values)
+    - Keep the instrument's row order across images
+    - Use a single set of column headers
+    """ + EXTRACTION_PROMPT
+
+MERGE_PROMPT_TEMPLATE = """
+    CRITICAL: You MUST respond with ONLY valid JSON. No explanations, no markdown, no conversational text.
+
+    Task: Merge nanodrop results from {image_count} images into a single result.
+
+    Input data: {payload}
+
+    Rules:
+    1. Combine all samples, sorted by sample_number
+    2. For duplicate sample_numbers: choose most reliable reading (avoid negative values, prefer good ratios)
+    3. Determine overall assay_type
+    4. Include brief commentary about conflicts and quality
+
+    RESPOND WITH ONLY THIS JSON STRUCTURE (no other text):
+    {{
+        "assay_type": "DNA",
+        "commentary": "Processed {image_count} images with N samples. Brief quality assessment.",
+        "samples": [
+            {{
+                "sample_number": 1,
+                "concentration": 87.3,
+                "a260_a280": 1.94,
+                "a260_a230": 2.07
+            }}
+        ]
+    }}"""
+
+# Function schema for structured merge output
+MERGE_FUNCTION = {
+    "name": "merge_nanodrop_results",
+    "description": "Merge nanodrop sample results from multiple images",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "assay_type": {
+                "type": "string",
+                "enum": ["DNA", "RNA", "Mixed", "Unknown"]
+            },
+            "commentary": {
+                "type": "string",
+                "description": "Brief explanation of merge process and quality assessment"
+            },
+            "samples": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "sample_number": {"type": "integer"},
+                        "concentration": {"type": "number"},
+                        "a260_a280": {"type": "number"},
+                        "a260_a230": {"type": "number"}
+                    },
+                    "required": ["sample_number", "concentration", "a260_a280", "a260_a230"]
+                }
+            }
+        },
+        "required": ["assay_type", "commentary", "samples"]
+    }
+}
+
+def _json_loads(text):
+    return orjson.loads(text) if orjson else json.loads(text)
+
+
+def _json_dumps(obj):
+    """Compact JSON text; non-ASCII is kept as UTF-8 rather than escaped."""
+    if orjson:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+# Markdown code fences the model sometimes wraps its JSON in
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+def _parse_llm_json(content):
+    """Parse JSON from a model response, unwrapping markdown fences if present.
+
+    When several fenced blocks are returned, the largest (most complete) wins.
+    """
+    blocks = _FENCE_RE.findall(content)
+    json_str = max(blocks, key=len) if blocks else content
+    return _json_loads(json_str)
+
 
 def get_openai_client():
     """Get or create OpenAI client."""
@@ -21,7 +164,20 @@ def get_openai_client():
         api_key = os.environ.get('OPENAI_API_KEY')
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
-        openai_client = openai.OpenAI(api_key=api_key)
+        # Imported here so cold starts that never reach the LLM skip loading the SDK
+        import httpx
+        import openai
+
+        openai_client = openai.OpenAI(
+            api_key=api_key,
+            http_client=openai.DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=None,
+                    max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                )
+            ),
+        )
     return openai_client
 
 
@@ -65,37 +221,64 @@ def normalize_unicode_headers(data):
     return data
 
 
-def extract_lab_data(image_bytes):
-    """Extract data from lab instrument image using GPT-4o - simplified universal approach."""
-    # Encode image to base64
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+def prepare_image_for_llm(image_bytes):
+    """Downscale an image to the resolution the vision model actually reads."""
+    from io import BytesIO
+    from PIL import Image, ImageOps
 
-    # Single universal prompt that handles everything
-    prompt = """
-    Extract ALL data from this lab instrument image.
+    try:
+        img = Image.open(BytesIO(image_bytes))
+        width, height = img.size
+        scale = min(
+            VISION_MAX_LONG_SIDE / max(width, height),
+            VISION_MAX_SHORT_SIDE / min(width, height),
+        )
+        if scale >= 1:
+            return image_bytes
+
+        # Bake in EXIF rotation, since re-encoding drops the orientation tag
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        width, height = img.size
+        img = img.resize(
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            Image.LANCZOS,
+        )
 
-    For standard tables (Nanodrop, UV-Vis, etc.):
-    - Extract exact column headers and all row data
-    - Use ASCII-safe units: "ng/uL" instead of "ng/μL", "deg" instead of "°"
+        output = BytesIO()
+        img.save(output, format='JPEG', quality=85, optimize=True)
+        return output.getvalue()
+    except Exception:
+        return image_bytes
 
-    For 96-well plates:
-    - Extract well positions (A1, B2, etc.) and values
-    - Also provide in long form: [{"well": "A1", "value": X}, ...]
 
-    Return JSON:
-    {
-        "instrument": "detected instrument type",
-        "confidence": "high|medium|low",
-        "is_plate_format": true/false,
-        "columns": ["headers"] (if table format),
-        "samples": [{"col1": "val1", ...}] or [{"well": "A1", "value": X}],
-        "plate_data": {"A1": value, ...} (if plate format),
-        "notes": "any relevant observations"
-    }
+def extract_lab_data(image_bytes):
+    """Extract data from lab instrument image using GPT-4o - simplified universal approach."""
+    return _extract_from_images(EXTRACTION_PROMPT, [image_bytes])
 
-    Extract all visible data precisely. Use scientific notation if shown (e.g., 1.23E+04).
-    IMPORTANT: Use ASCII-safe characters only in column headers and units.
+
+def extract_lab_data_batch(image_bytes_list):
+    """Extract one combined result from several images of the same run in a single GPT-4o call.
+
+    Replaces N per-image requests plus the merge request with one round trip.
     """
+    return _extract_from_images(BATCH_EXTRACTION_PROMPT, image_bytes_list)
+
+
+def _extract_from_images(prompt, image_bytes_list):
+    """Send the prompt and images in one chat completion and parse the JSON result."""
+    content_parts = [{"type": "text", "text": prompt}]
+    for image_bytes in image_bytes_list:
+        # Downscale to what the model reads, then encode to base64
+        base64_image = base64.b64encode(prepare_image_for_llm(image_bytes)).decode('ascii')
+        content_parts.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:image/jpeg;base64,{base64_image}",
+                "detail": "high"
+            }
+        })
 
     try:
         client = get_openai_client()
@@ -106,18 +289,11 @@ def extract_lab_data(image_bytes):
             messages=[
                 {
                     "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "high"
-                            }
-                        }
-                    ]
+                    "content": content_parts
                 }
             ],
+            # JSON mode: the reply is a bare JSON object, never fenced prose
+            response_format={"type": "json_object"},
             temperature=0.1
             # Let OpenAI handle tokens and timeout defaults
         )
@@ -139,16 +315,8 @@ def extract_lab_data(image_bytes):
     # Parse response
     content = response.choices[0].message.content
 
-    # Extract JSON from response
-    if "```json" in content:
-        json_str = content.split("```json")[1].split("```")[0]
-    elif "```" in content:
-        json_str = content.split("```")[1].split("```")[0]
-    else:
-        json_str = content
-
     try:
-        result = json.loads(json_str.strip())
+        result = _json_loads(content)
 
         # Normalize Unicode characters in headers and data
         result = normalize_unicode_headers(result)
@@ -161,7 +329,7 @@ def extract_lab_data(image_bytes):
         if "instrument" in result:
             instrument_type = result.get("instrument", "unknown")
             confidence = result.get("confidence", "unknown")
-            logger.info(f"Detected instrument: {instrument_type} (confidence: {confidence})")
+            logger.info("Detected instrument", instrument=instrument_type, confidence=confidence)
 
         return result
 
@@ -188,70 +356,15 @@ def merge_lab_results(results_list):
             "samples": result.get("samples", [])
         })
 
-    merge_prompt = f"""
-    CRITICAL: You MUST respond with ONLY valid JSON. No explanations, no markdown, no conversational text.
-
-    Task: Merge nanodrop results from {len(results_list)} images into a single result.
-
-    Input data: {json.dumps(merge_input, indent=2)}
-
-    Rules:
-    1. Combine all samples, sorted by sample_number
-    2. For duplicate sample_numbers: choose most reliable reading (avoid negative values, prefer good ratios)
-    3. Determine overall assay_type
-    4. Include brief commentary about conflicts and quality
-
-    RESPOND WITH ONLY THIS JSON STRUCTURE (no other text):
-    {{
-        "assay_type": "DNA",
-        "commentary": "Processed {len(results_list)} images with N samples. Brief quality assessment.",
-        "samples": [
-            {{
-                "sample_number": 1,
-                "concentration": 87.3,
-                "a260_a280": 1.94,
-                "a260_a230": 2.07
-            }}
-        ]
-    }}"""
+    merge_prompt = MERGE_PROMPT_TEMPLATE.format(
+        image_count=len(results_list),
+        payload=_json_dumps(merge_input),
+    )
 
     try:
         client = get_openai_client()
         start_time = time.time()
 
-        # Define function schema for structured output
-        merge_function = {
-            "name": "merge_nanodrop_results",
-            "description": "Merge nanodrop sample results from multiple images",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "assay_type": {
-                        "type": "string",
-                        "enum": ["DNA", "RNA", "Mixed", "Unknown"]
-                    },
-                    "commentary": {
-                        "type": "string",
-                        "description": "Brief explanation of merge process and quality assessment"
-                    },
-                    "samples": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "sample_number": {"type": "integer"},
-                                "concentration": {"type": "number"},
-                                "a260_a280": {"type": "number"},
-                                "a260_a230": {"type": "number"}
-                            },
-                            "required": ["sample_number", "concentration", "a260_a280", "a260_a230"]
-                        }
-                    }
-                },
-                "required": ["assay_type", "commentary", "samples"]
-            }
-        }
-
         response = client.chat.completions.create(
             model="gpt-4o",
             messages=[
@@ -260,7 +373,7 @@ def merge_lab_results(results_list):
                     "content": merge_prompt
                 }
             ],
-            functions=[merge_function],
+            functions=[MERGE_FUNCTION],
             function_call={"name": "merge_nanodrop_results"},
             temperature=0.1,
             timeout=30
@@ -287,7 +400,7 @@ def merge_lab_results(results_list):
                        function_name=message.function_call.name,
                        args_length=len(function_args))
 
-            result = json.loads(function_args)
+            result = _json_loads(function_args)
 
             # Validate the result has all required fields and reasonable data
             if not isinstance(result.get('samples'), list) or len(result.get('samples', [])) == 0:
@@ -305,33 +418,13 @@ def merge_lab_results(results_list):
             # Fallback to content parsing
             content = message.content
 
-            # Extract JSON from response - handle multiple JSON blocks by taking the largest
-            if "```json" in content:
-                # Find all JSON blocks and take the largest one (most complete)
-                json_blocks = content.split("```json")[1:]
-                json_candidates = []
-                for block in json_blocks:
-                    candidate = block.split("```")[0].strip()
-                    if candidate:
-                        json_candidates.append(candidate)
-
-                if json_candidates:
-                    # Choose the largest JSON block (likely the most complete)
-                    json_str = max(json_candidates, key=len)
-                else:
-                    json_str = content
-            elif "```" in content:
-                json_str = content.split("```")[1].split("```")[0]
-            else:
-                json_str = content
-
-            # Log the extracted JSON for debugging
+            # Log the raw content for debugging before parsing it
             logger.info("LLM merge JSON extraction",
                        content_length=len(content),
                        json_blocks_found=content.count("```"),
-                       extracted_json_preview=json_str[:200] + "..." if len(json_str) > 200 else json_str)
+                       content_preview=content[:200] + "..." if len(content) > 200 else content)
 
-            return json.loads(json_str.strip())
+            return _parse_llm_json(content)
 
     except Exception as e:
         logger.warning("LLM merge failed, using fallback", error=str(e))
@@ -350,42 +443,26 @@ def merge_nanodrop_results_old(results_list):
 
 def fallback_merge(results_list):
     """Fallback deterministic merge if LLM merge fails."""
-    all_samples = []
-    all_assay_types = set()
-    all_commentary = []
-
-    for result in results_list:
-        all_samples.extend(result.get('samples', []))
-        if 'assay_type' in result and result['assay_type'] != 'Unknown':
-            all_assay_types.add(result['assay_type'])
-        if 'commentary' in result:
-            all_commentary.append(result['commentary'])
-
-    # Merge samples by sample_number (prefer non-zero concentrations and better ratios)
+    all_samples = chain.from_iterable(result.get('samples', ()) for result in results_list)
+    all_assay_types = {
+        result['assay_type'] for result in results_list
+        if 'assay_type' in result and result['assay_type'] != 'Unknown'
+    }
+    all_commentary = [result['commentary'] for result in results_list if 'commentary' in result]
+
+    # Merge samples by sample_number, keeping the highest concentration reading.
+    # This prefers positive readings over zero/negative ones; ties keep the first seen.
     sample_dict = {}
     for sample in all_samples:
         sample_num = sample['sample_number']
-        if sample_num not in sample_dict:
+        existing = sample_dict.get(sample_num)
+        if existing is None or sample.get('concentration', 0) > existing.get('concentration', 0):
             sample_dict[sample_num] = sample
-        else:
-            # If duplicate, prefer the sample with higher concentration and better ratios
-            existing = sample_dict[sample_num]
-            current = sample
-
-            # Prefer non-zero/positive concentrations
-            if existing.get('concentration', 0) <= 0 and current.get('concentration', 0) > 0:
-                sample_dict[sample_num] = current
-            elif existing.get('concentration', 0) > 0 and current.get('concentration', 0) <= 0:
-                continue  # Keep existing
-            else:
-                # Both valid or both invalid - prefer higher concentration
-                if current.get('concentration', 0) > existing.get('concentration', 0):
-                    sample_dict[sample_num] = current
 
-    unique_samples = sorted(sample_dict.values(), key=lambda x: x['sample_number'])
+    unique_samples = sorted(sample_dict.values(), key=itemgetter('sample_number'))
 
     return {
-        'assay_type': list(all_assay_types)[0] if len(all_assay_types) == 1 else 'Mixed',
+        'assay_type': 'Mixed' if len(all_assay_types) > 1 else next(iter(all_assay_types), 'Unknown'),
         'commentary': f"Processed {len(results_list)} images. " + " | ".join(all_commentary),
         'samples': unique_samples
     }
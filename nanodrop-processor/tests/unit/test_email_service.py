@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the results email builder.
+"""
+
+import email
+import pytest
+import sys
+import os
+from unittest.mock import Mock
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services.email_service import send_success_email
+
+
+def _sent_message(ses_client):
+    raw = ses_client.send_raw_email.call_args.kwargs['RawMessage']['Data']
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    return email.message_from_bytes(raw)
+
+
+class TestSendSuccessEmail:
+    """Test the MIME structure of the results email."""
+
+    @pytest.mark.unit
+    def test_csv_attachment_round_trips_utf8(self):
+        """Non-ASCII CSV content must decode back to the same text."""
+        ses_client = Mock()
+        csv_content = "Sample,Concentration (ng/μL)\nCas9 – guide,12.5\n"
+        data = {
+            'assay_type': 'DNA',
+            'samples': [{'sample_number': 1, 'concentration': 12.5}],
+        }
+
+        send_success_email(ses_client, ['user@example.com'], csv_content, data, [])
+
+        msg = _sent_message(ses_client)
+        csv_parts = [p for p in msg.walk() if p.get_content_type() == 'text/csv']
+        assert len(csv_parts) == 1
+        assert csv_parts[0].get_content_charset() == 'utf-8'
+        assert csv_parts[0].get_payload(decode=True).decode('utf-8') == csv_content
+
+    @pytest.mark.unit
+    def test_raw_message_is_smtp_bytes(self):
+        """The raw message should be sent as CRLF-terminated bytes."""
+        ses_client = Mock()
+        data = {'assay_type': 'DNA', 'samples': [{'sample_number': 1}]}
+
+        send_success_email(ses_client, ['user@example.com'], "a,b\n1,2\n", data, [])
+
+        raw = ses_client.send_raw_email.call_args.kwargs['RawMessage']['Data']
+        assert isinstance(raw, bytes)
+        assert b'\r\nSubject: Lab Data Results' in raw
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Unit tests for LLM service helpers that don't call the OpenAI API.
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services.llm_service import (
+    VISION_MAX_LONG_SIDE,
+    VISION_MAX_SHORT_SIDE,
+    _json_dumps,
+    _parse_llm_json,
+    fallback_merge,
+    prepare_image_for_llm,
+)
+
+
+def _image_bytes(size, fmt='JPEG', mode='RGB'):
+    output = io.BytesIO()
+    Image.new(mode, size, color='white').save(output, format=fmt)
+    return output.getvalue()
+
+
+class TestPrepareImageForLLM:
+    """Test image downscaling before the vision API call."""
+
+    @pytest.mark.unit
+    def test_large_photo_is_downscaled(self):
+        """A phone-sized photo is shrunk to the short-side limit."""
+        result = prepare_image_for_llm(_image_bytes((4032, 3024)))
+
+        img = Image.open(io.BytesIO(result))
+        assert img.format == 'JPEG'
+        assert min(img.size) == VISION_MAX_SHORT_SIDE
+        assert max(img.size) <= VISION_MAX_LONG_SIDE
+
+    @pytest.mark.unit
+    def test_small_image_is_unchanged(self):
+        """Images already within limits are passed through untouched."""
+        original = _image_bytes((800, 600))
+        assert prepare_image_for_llm(original) is original
+
+    @pytest.mark.unit
+    def test_png_with_alpha_is_converted(self):
+        """Transparent PNGs are flattened so they can be saved as JPEG."""
+        result = prepare_image_for_llm(_image_bytes((3000, 2000), fmt='PNG', mode='RGBA'))
+
+        img = Image.open(io.BytesIO(result))
+        assert img.format == 'JPEG'
+        assert img.mode == 'RGB'
+
+    @pytest.mark.unit
+    def test_invalid_bytes_are_returned_as_is(self):
+        """Non-image data falls back to the original bytes."""
+        assert prepare_image_for_llm(b"not an image") == b"not an image"
+
+
+class TestParseLLMJson:
+    """Test JSON extraction from model responses."""
+
+    @pytest.mark.unit
+    def test_plain_json(self):
+        assert _parse_llm_json(' {"samples": []}\n') == {"samples": []}
+
+    @pytest.mark.unit
+    def test_json_fence(self):
+        content = 'Here you go:\n```json\n{"instrument": "NanoDrop"}\n```\nDone.'
+        assert _parse_llm_json(content) == {"instrument": "NanoDrop"}
+
+    @pytest.mark.unit
+    def test_bare_fence(self):
+        assert _parse_llm_json('```\n{"a": 1}\n```') == {"a": 1}
+
+    @pytest.mark.unit
+    def test_largest_block_wins(self):
+        content = (
+            '```json\n{"samples": []}\n```\n'
+            'Corrected:\n```json\n{"samples": [{"sample_number": 1}]}\n```'
+        )
+        assert _parse_llm_json(content) == {"samples": [{"sample_number": 1}]}
+
+    @pytest.mark.unit
+    def test_compact_dump_round_trips(self):
+        payload = {"images": [{"commentary": "ng/μL", "samples": [{"a260_a280": 1.94}]}]}
+        dumped = _json_dumps(payload)
+        assert " " not in dumped
+        assert "μ" in dumped
+        assert _parse_llm_json(dumped) == payload
+
+    @pytest.mark.unit
+    def test_invalid_json_raises(self):
+        with pytest.raises(json.JSONDecodeError):
+            _parse_llm_json("```json\nnot json\n```")
+
+
+class TestFallbackMerge:
+    """Test the deterministic merge used when the LLM merge fails."""
+
+    @pytest.mark.unit
+    def test_samples_sorted_and_deduplicated(self):
+        results = [
+            {'assay_type': 'DNA', 'samples': [
+                {'sample_number': 3, 'concentration': 30.0},
+                {'sample_number': 1, 'concentration': 10.0},
+            ]},
+            {'assay_type': 'DNA', 'samples': [
+                {'sample_number': 2, 'concentration': 20.0},
+                {'sample_number': 1, 'concentration': 10.0, 'source': 'second'},
+            ]},
+        ]
+
+        merged = fallback_merge(results)
+
+        assert [s['sample_number'] for s in merged['samples']] == [1, 2, 3]
+        # Ties keep the first reading seen
+        assert 'source' not in merged['samples'][0]
+        assert merged['assay_type'] == 'DNA'
+
+    @pytest.mark.unit
+    def test_duplicate_prefers_positive_then_higher_concentration(self):
+        results = [
+            {'samples': [
+                {'sample_number': 1, 'concentration': -2.0},
+                {'sample_number': 2, 'concentration': 15.0},
+            ]},
+            {'samples': [
+                {'sample_number': 1, 'concentration': 4.5},
+                {'sample_number': 2, 'concentration': 0.0},
+            ]},
+            {'samples': [{'sample_number': 2, 'concentration': 18.0}]},
+        ]
+
+        merged = fallback_merge(results)
+
+        assert [s['concentration'] for s in merged['samples']] == [4.5, 18.0]
+
+    @pytest.mark.unit
+    def test_missing_assay_type_is_unknown_not_mixed(self):
+        results = [
+            {'instrument': 'NanoDrop', 'samples': [{'sample_number': 1}]},
+            {'instrument': 'NanoDrop', 'samples': [{'sample_number': 2}]},
+        ]
+
+        assert fallback_merge(results)['assay_type'] == 'Unknown'
+
+    @pytest.mark.unit
+    def test_different_assay_types_are_mixed(self):
+        results = [
+            {'assay_type': 'DNA', 'samples': [{'sample_number': 1}]},
+            {'assay_type': 'RNA', 'samples': [{'sample_number': 2}]},
+        ]
+
+        assert fallback_merge(results)['assay_type'] == 'Mixed'
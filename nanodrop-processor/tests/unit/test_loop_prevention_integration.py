@@ -3,6 +3,7 @@
 Integration tests for loop prevention in email processing.
 """
 
+import io
 import pytest
 import sys
 import os
@@ -32,7 +33,7 @@ This is a results email that should be ignored.
 """
         
         mock_s3.get_object.return_value = {
-            'Body': Mock(read=Mock(return_value=results_email_content))
+            'Body': io.BytesIO(results_email_content)
         }
         
         # Create test event
@@ -77,7 +78,7 @@ This email is from our service and should be ignored.
 """
         
         mock_s3.get_object.return_value = {
-            'Body': Mock(read=Mock(return_value=service_email_content))
+            'Body': io.BytesIO(service_email_content)
         }
         
         # Create test event
@@ -116,7 +117,7 @@ This email was already processed and should be ignored.
 """
         
         mock_s3.get_object.return_value = {
-            'Body': Mock(read=Mock(return_value=processed_email_content))
+            'Body': io.BytesIO(processed_email_content)
         }
         
         # Create test event
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Unit tests for batched and concurrent per-image extraction in the Lambda handler.
+"""
+
+import io
+import pytest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+import lambda_function
+
+
+def _attachments(*payloads):
+    return [
+        {'content_type': 'image/jpeg', 'data': data, 'filename': f'img{i}.jpg'}
+        for i, data in enumerate(payloads, 1)
+    ]
+
+
+class TestExtractAllImages:
+    """Test _extract_all_images ordering, concurrency and error handling."""
+
+    @pytest.mark.unit
+    def test_results_keep_attachment_order(self):
+        """Slow first image must still come back first."""
+        delays = {b'first': 0.05, b'second': 0.0, b'third': 0.01}
+
+        def fake_extract(image_bytes):
+            time.sleep(delays[image_bytes])
+            return {'samples': [{'sample_name': image_bytes.decode()}]}
+
+        with patch.object(lambda_function, 'extract_lab_data', side_effect=fake_extract), \
+             patch.object(lambda_function, 'logger'):
+            results, images, errors = lambda_function._extract_all_images(
+                _attachments(b'first', b'second', b'third')
+            )
+
+        assert [r['samples'][0]['sample_name'] for r in results] == ['first', 'second', 'third']
+        assert images == [b'first', b'second', b'third']
+        assert errors == []
+
+    @pytest.mark.unit
+    def test_images_are_processed_concurrently(self):
+        """All calls must be in flight at the same time."""
+        barrier = threading.Barrier(3, timeout=2)
+
+        def fake_extract(image_bytes):
+            barrier.wait()
+            return {'samples': []}
+
+        with patch.object(lambda_function, 'extract_lab_data', side_effect=fake_extract), \
+             patch.object(lambda_function, 'logger'):
+            results, _, errors = lambda_function._extract_all_images(
+                _attachments(b'a', b'b', b'c')
+            )
+
+        assert len(results) == 3
+        assert errors == []
+
+    @pytest.mark.unit
+    def test_failed_image_is_skipped(self):
+        """A failing or empty attachment should not stop the others."""
+        def fake_extract(image_bytes):
+            if image_bytes == b'bad':
+                raise RuntimeError("No tabular data found")
+            return {'samples': [{}]}
+
+        with patch.object(lambda_function, 'extract_lab_data', side_effect=fake_extract), \
+             patch.object(lambda_function, 'logger'):
+            results, images, errors = lambda_function._extract_all_images(
+                _attachments(b'ok', b'bad', b'')
+            )
+
+        assert images == [b'ok']
+        assert len(results) == 1
+        assert errors == [
+            "Image 2: No tabular data found",
+            "Image 3: Attachment missing image bytes",
+        ]
+
+
+class TestExtractBatch:
+    """Test the single-call batch extraction and its fallback signal."""
+
+    @pytest.mark.unit
+    def test_batch_result_returned(self):
+        combined = {'samples': [{'sample_number': 1}, {'sample_number': 2}]}
+
+        with patch.object(lambda_function, 'extract_lab_data_batch', return_value=combined) as batch, \
+             patch.object(lambda_function, 'logger'):
+            result = lambda_function._extract_batch(_attachments(b'a', b'b'))
+
+        assert result is combined
+        batch.assert_called_once_with([b'a', b'b'])
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('outcome', [RuntimeError("OpenAI API error"), {'samples': []}])
+    def test_failure_or_empty_result_returns_none(self, outcome):
+        kwargs = {'side_effect': outcome} if isinstance(outcome, Exception) else {'return_value': outcome}
+
+        with patch.object(lambda_function, 'extract_lab_data_batch', **kwargs), \
+             patch.object(lambda_function, 'logger'):
+            assert lambda_function._extract_batch(_attachments(b'a', b'b')) is None
+
+    @pytest.mark.unit
+    def test_missing_image_bytes_skips_batch(self):
+        with patch.object(lambda_function, 'extract_lab_data_batch') as batch, \
+             patch.object(lambda_function, 'logger'):
+            assert lambda_function._extract_batch(_attachments(b'a', b'')) is None
+
+        batch.assert_not_called()
+
+
+class TestDedupeAttachments:
+    """Test removal of byte-identical attachments before extraction."""
+
+    @pytest.mark.unit
+    def test_duplicates_removed_in_order(self):
+        attachments = _attachments(b'a', b'b', b'a', b'c', b'b')
+
+        with patch.object(lambda_function, 'logger'):
+            unique = lambda_function._dedupe_attachments(attachments)
+
+        assert [a['data'] for a in unique] == [b'a', b'b', b'c']
+        assert [a['filename'] for a in unique] == ['img1.jpg', 'img2.jpg', 'img4.jpg']
+
+    @pytest.mark.unit
+    def test_no_duplicates_is_unchanged(self):
+        attachments = _attachments(b'a', b'b')
+
+        with patch.object(lambda_function, 'logger'):
+            assert lambda_function._dedupe_attachments(attachments) == attachments
+
+    @pytest.mark.unit
+    def test_duplicates_count_toward_attachment_limit(self):
+        """The handler validates the raw attachment list before deduping it."""
+        attachments = _attachments(*[b'same'] * 6)
+        event = {'Records': [{'s3': {'bucket': {'name': 'test-bucket'},
+                                     'object': {'key': 'test-key', 'size': 1024}}}]}
+        raw_email = b"From: user@example.com\nTo: nanodrop@seminalcapital.net\nSubject: Plate\n\nSee attached.\n"
+
+        with patch.object(lambda_function, 's3') as s3, \
+             patch.object(lambda_function, 'security') as security, \
+             patch.object(lambda_function, 'extract_images_from_email', return_value=attachments), \
+             patch.object(lambda_function, 'send_error_email'), \
+             patch.object(lambda_function, 'logger'):
+            s3.get_object.return_value = {'Body': io.BytesIO(raw_email)}
+            security.validate_email_sender.return_value = {'valid': True}
+            security.check_rate_limit.return_value = {'allowed': True}
+            security.validate_attachments.return_value = {'valid': False, 'errors': ['Too many attachments']}
+
+            result = lambda_function.lambda_handler(event, None)
+
+        assert result['body'] == 'Invalid attachments'
+        assert len(security.validate_attachments.call_args[0][0]) == 6